@@ -1,34 +1,246 @@
-from django.contrib import admin
-from .models import Transaction, Budget
+import json
 
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-@admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ('user', 'type', 'category', 'amount', 'date', 'created_at')
-    list_filter = ('type', 'category', 'date', 'user')
-    search_fields = ('user__email', 'description', 'category')
-    readonly_fields = ('created_at', 'updated_at')
-    ordering = ('-date', '-created_at')
+from .models import Transaction, Budget, Tombstone
+from .serializers import users_with_email
+from .signals import budgets_bulk_changed, suppress_model_signals, transactions_bulk_changed
+from .sync import pending_write
+
+# Below the 999 parameters older SQLite builds allow in one query
+DELETE_BATCH_SIZE = 500
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that skips the exact COUNT(*) on large result sets.
+
+    On PostgreSQL the planner's row estimate for the changelist query is used
+    once it exceeds ADMIN_EXACT_COUNT_LIMIT; smaller results, and other
+    databases, are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = int(plan[0]['Plan']['Plan Rows'])
+            if estimate > settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+        return super().count
+
+
+class UserAutocompleteFilter(admin.SimpleListFilter):
+    """
+    Filter by user through the admin's user autocomplete, instead of listing
+    every user in the sidebar.
+    """
+    title = 'user'
+    parameter_name = 'user'
+    template = 'admin/api/user_autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        super().__init__(request, params, model, model_admin)
+
+    def lookups(self, request, model_admin):
+        # Only the selected user; the rest are found through the autocomplete
+        value = self.value()
+        if value and value.isdigit():
+            return User.objects.filter(pk=value).values_list('pk', 'email')
+        return ()
+
+    def has_output(self):
+        # Other staff only ever see their own rows
+        return self.request.user.is_superuser
+
+    def choices(self, changelist):
+        self.query_string = changelist.get_query_string(remove=[self.parameter_name])
+        return super().choices(changelist)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(user_id=self.value())
+        return queryset
+
+
+def is_user_scoped(request):
+    """True when the changelist only holds one user's rows"""
+    return not request.user.is_superuser or bool(request.GET.get(UserAutocompleteFilter.parameter_name))
+
+
+class UserScopedDateHierarchyChangeList(ChangeList):
+    """
+    Only offer the date hierarchy once the list is narrowed to one user, where
+    the (user, date) index answers its min/max and distinct-date queries.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        if not is_user_scoped(request):
+            self.date_hierarchy = None
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: no full-table
+    COUNT(*), no per-row user queries, no user list in the sidebar, and
+    set-based deletes.
+    """
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+    search_help_text = 'Search by exact user email, or by text in the listed fields'
+    # Set-based writes bypass per-row signals; this signal (if any) is sent
+    # once per affected user instead, with the months touched when a date
+    # field is set
+    bulk_changed_signal = None
+    bulk_changed_date_field = None
 
     def get_queryset(self, request):
-        """Only show transactions for the current user (non-superusers)"""
+        """Only show the current user's rows to non-superusers"""
         qs = super().get_queryset(request)
         if not request.user.is_superuser:
             qs = qs.filter(user=request.user)
         return qs
 
+    def get_search_results(self, request, queryset, search_term):
+        # An email goes through the LOWER(email) index instead of a LIKE join
+        if '@' in search_term:
+            return queryset.filter(user__in=users_with_email(search_term.strip())), False
+        return super().get_search_results(request, queryset, search_term)
+
+    @property
+    def media(self):
+        autocomplete = AutocompleteSelect(self.model._meta.get_field('user'), self.admin_site).media
+        return super().media + autocomplete + forms.Media(js=['api/admin/user_autocomplete_filter.js'])
+
+    def get_deleted_objects(self, objs, request):
+        # The default confirmation page loads and lists every selected row;
+        # nothing references these rows, so a count is enough
+        opts = self.model._meta
+        count = len(objs) if isinstance(objs, list) else objs.count()
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        summary = f'{count} {opts.verbose_name if count == 1 else opts.verbose_name_plural}'
+        return [summary], {opts.verbose_name_plural: count}, perms_needed, []
+
+    def delete_queryset(self, request, queryset):
+        """Delete in batches with tombstones but no per-row signals, then notify per user"""
+        model = queryset.model
+        with pending_write(*self.user_ids(queryset)), transaction.atomic():
+            affected = self.affected_users(queryset)
+            # Only ids are held in memory; each delete loads one batch of rows
+            rows = list(queryset.order_by().values_list('user_id', 'id'))
+            # The per-row handlers would update the rollup and alerts once
+            # per row; the bulk signals below bring them and the caches back
+            # in step
+            with suppress_model_signals():
+                for start in range(0, len(rows), DELETE_BATCH_SIZE):
+                    batch = rows[start:start + DELETE_BATCH_SIZE]
+                    Tombstone.objects.bulk_create([
+                        Tombstone(user_id=user_id, model=model._meta.model_name, object_id=object_id)
+                        for user_id, object_id in batch
+                    ])
+                    model.objects.filter(pk__in=[object_id for _, object_id in batch]).delete()
+            self.send_bulk_changed(affected)
+
+    def user_ids(self, queryset):
+        """Ids of the users owning rows in ``queryset``"""
+        return list(queryset.order_by().values_list('user_id', flat=True).distinct())
+
+    def affected_users(self, queryset):
+        """
+        Users owning rows in ``queryset``, each mapped to the extra arguments
+        for ``bulk_changed_signal`` (the months touched, when
+        ``bulk_changed_date_field`` is set)
+        """
+        queryset = queryset.order_by()
+        if self.bulk_changed_date_field is None:
+            return {user: {} for user in User.objects.filter(pk__in=self.user_ids(queryset))}
+        months = {}
+        rows = queryset.values_list('user_id', TruncMonth(self.bulk_changed_date_field)).distinct()
+        for user_id, month in rows:
+            months.setdefault(user_id, set()).add(month)
+        users = User.objects.in_bulk(months)
+        return {users[user_id]: {'dates': user_months} for user_id, user_months in months.items()}
+
+    def send_bulk_changed(self, affected):
+        """Send ``bulk_changed_signal`` for each user returned by affected_users"""
+        if self.bulk_changed_signal is None:
+            return
+        for user, arguments in affected.items():
+            self.bulk_changed_signal.send(sender=self.model, user=user, **arguments)
+
+
+class TransactionActionForm(ActionForm):
+    category = forms.ChoiceField(
+        choices=[('', 'New category…')] + Transaction.ALL_CATEGORIES,
+        required=False,
+    )
+
+
+@admin.register(Transaction)
+class TransactionAdmin(ScalableModelAdmin):
+    list_display = ('user', 'type', 'category', 'amount', 'date', 'created_at')
+    list_filter = ('type', 'category', 'date', UserAutocompleteFilter)
+    search_fields = ('description', 'category')
+    readonly_fields = ('created_at', 'updated_at')
+    ordering = ('-date', '-created_at')
+    date_hierarchy = 'date'
+    action_form = TransactionActionForm
+    actions = ['change_category']
+    bulk_changed_signal = transactions_bulk_changed
+    bulk_changed_date_field = 'date'
+
+    def get_changelist(self, request, **kwargs):
+        return UserScopedDateHierarchyChangeList
+
+    def get_ordering(self, request):
+        # Across all users no index covers date order; newest-first by
+        # primary key avoids sorting the whole table for every page
+        if is_user_scoped(request):
+            return super().get_ordering(request)
+        return ('-pk',)
+
+    @admin.action(description='Change category of selected transactions', permissions=['change'])
+    def change_category(self, request, queryset):
+        category = request.POST.get('category')
+        if category not in dict(Transaction.ALL_CATEGORIES):
+            self.message_user(request, 'Choose a category next to the action.', messages.WARNING)
+            return
+        with pending_write(*self.user_ids(queryset)), transaction.atomic():
+            affected = self.affected_users(queryset)
+            updated = queryset.order_by().update(category=category, updated_at=timezone.now())
+            self.send_bulk_changed(affected)
+        self.message_user(request, f'Moved {updated} transactions to {category}.', messages.SUCCESS)
+
 
 @admin.register(Budget)
-class BudgetAdmin(admin.ModelAdmin):
+class BudgetAdmin(ScalableModelAdmin):
     list_display = ('user', 'category', 'limit_amount', 'created_at')
-    list_filter = ('category', 'user')
-    search_fields = ('user__email', 'category')
+    list_filter = ('category', UserAutocompleteFilter)
+    search_fields = ('category',)
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
-
-    def get_queryset(self, request):
-        """Only show budgets for the current user (non-superusers)"""
-        qs = super().get_queryset(request)
-        if not request.user.is_superuser:
-            qs = qs.filter(user=request.user)
-        return qs
+    bulk_changed_signal = budgets_bulk_changed
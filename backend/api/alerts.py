@@ -0,0 +1,78 @@
+"""
+Budget threshold alerts, evaluated when spending or budgets change.
+
+After every Transaction or Budget write (see ``api.signals``) the current
+month's spending per budgeted category is read from the MonthlyCategoryTotal
+rollup and compared with the budget limit. Each of BUDGET_ALERT_THRESHOLDS
+(percentages of the limit) that is reached is recorded once per category and
+month as a BudgetAlert. Unread alerts whose threshold is no longer reached,
+because spending was edited or deleted or the budget changed, are withdrawn.
+
+Clients poll the small unread feed (``/api/alerts/``) instead of recomputing
+the budget comparison to decide whether to show a warning.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Budget, BudgetAlert, MonthlyCategoryTotal
+
+
+def evaluate_budget_alerts(user_id, categories=None, today=None):
+    """
+    Bring the current month's alerts in line with spending.
+
+    ``categories`` limits the work to those categories (e.g. the ones a
+    transaction write touched); None evaluates every budget of the user.
+    """
+    month = (today or date.today()).replace(day=1)
+    budgets = Budget.objects.filter(user_id=user_id)
+    alerts = BudgetAlert.objects.filter(user_id=user_id, month=month)
+    if categories is not None:
+        categories = {category for category in categories if category}
+        if not categories:
+            return
+        budgets = budgets.filter(category__in=categories)
+        alerts = alerts.filter(category__in=categories)
+
+    limits = dict(budgets.values_list('category', 'limit_amount'))
+    spending = dict(
+        MonthlyCategoryTotal.objects.filter(
+            user_id=user_id, month=month, type='expense', category__in=list(limits)
+        ).values_list('category', 'total')
+    ) if limits else {}
+
+    existing = set(alerts.values_list('category', 'threshold'))
+    reached = set()
+    created = []
+    for category, limit in limits.items():
+        # A zero limit has no percentage, as in spending_vs_budget
+        if limit <= 0:
+            continue
+        spent = spending.get(category, Decimal('0.00'))
+        percentage = spent / limit * 100
+        for threshold in settings.BUDGET_ALERT_THRESHOLDS:
+            if percentage < threshold:
+                continue
+            reached.add((category, threshold))
+            if (category, threshold) not in existing:
+                created.append(BudgetAlert(
+                    user_id=user_id,
+                    category=category,
+                    month=month,
+                    threshold=threshold,
+                    spent=spent,
+                    limit_amount=limit,
+                ))
+
+    withdrawn = existing - reached
+    if withdrawn:
+        condition = Q()
+        for category, threshold in withdrawn:
+            condition |= Q(category=category, threshold=threshold)
+        alerts.filter(condition, read_at__isnull=True).delete()
+    if created:
+        # A concurrent write may have recorded the same crossing
+        BudgetAlert.objects.bulk_create(created, ignore_conflicts=True)
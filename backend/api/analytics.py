@@ -0,0 +1,244 @@
+"""
+Database-side analytics shared by the dashboard endpoints.
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncWeek, TruncYear
+
+from .models import ArchivedTransaction, Budget, MonthlyCategoryTotal, Transaction
+from .serializers import serialize_transaction_rows, transaction_rows
+
+TREND_BUCKETS = ('day', 'week', 'month', 'year')
+TREND_TYPES = ('expense', 'income', 'all')
+TREND_SPLITS = ('category', 'type')
+
+# Default and maximum number of buckets per granularity
+TREND_DEFAULT_WINDOW = {'day': 30, 'week': 12, 'month': 12, 'year': 5}
+TREND_MAX_WINDOW = {'day': 731, 'week': 260, 'month': 120, 'year': 50}
+
+
+def bucket_start(value, bucket):
+    """Return the first day of the bucket containing ``value``"""
+    if bucket == 'week':
+        return value - timedelta(days=value.weekday())
+    if bucket == 'month':
+        return value.replace(day=1)
+    if bucket == 'year':
+        return value.replace(month=1, day=1)
+    return value
+
+
+def _shift(value, bucket, steps):
+    """Move a bucket start ``steps`` buckets forward (negative for backward)"""
+    if bucket == 'day':
+        return value + timedelta(days=steps)
+    if bucket == 'week':
+        return value + timedelta(weeks=steps)
+    if bucket == 'month':
+        months = value.year * 12 + value.month - 1 + steps
+        return date(months // 12, months % 12 + 1, 1)
+    return value.replace(year=value.year + steps)
+
+
+def _split_key(row, split):
+    if split == 'category':
+        return row['category'] or 'uncategorized'
+    return row['type']
+
+
+def parse_trend_params(params):
+    """
+    Validate spending trend query parameters.
+
+    Returns ``(options, error)``: keyword arguments for ``spending_trend`` and
+    None, or None and an error message.
+    """
+    bucket = params.get('bucket', 'day')
+    if bucket not in TREND_BUCKETS:
+        return None, f"bucket must be one of: {', '.join(TREND_BUCKETS)}"
+
+    try:
+        window = int(params.get('window', TREND_DEFAULT_WINDOW[bucket]))
+    except ValueError:
+        window = 0
+    if not 1 <= window <= TREND_MAX_WINDOW[bucket]:
+        return None, f'window must be an integer between 1 and {TREND_MAX_WINDOW[bucket]}'
+
+    transaction_type = params.get('type', 'expense')
+    if transaction_type not in TREND_TYPES:
+        return None, f"type must be one of: {', '.join(TREND_TYPES)}"
+
+    split = params.get('split') or None
+    if split is not None and split not in TREND_SPLITS:
+        return None, f"split must be one of: {', '.join(TREND_SPLITS)}"
+
+    return {'bucket': bucket, 'window': window, 'type': transaction_type, 'split': split}, None
+
+
+def spending_trend(user, bucket='day', window=None, type='expense', split=None, today=None):
+    """
+    Return ``window`` consecutive buckets ending with the current one.
+
+    Totals are grouped in the database: day and week buckets truncate the
+    date of hot and archived transactions, month and year buckets are read
+    from the monthly rollup in a single query. Buckets without activity are filled with zero. With
+    ``split`` each bucket also carries a per-category or per-type breakdown.
+    """
+    today = today or date.today()
+    window = window or TREND_DEFAULT_WINDOW[bucket]
+    current = bucket_start(today, bucket)
+    first = _shift(current, bucket, -(window - 1))
+
+    if bucket in ('month', 'year'):
+        sources = [MonthlyCategoryTotal.objects.filter(user=user, month__gte=first, month__lte=today)]
+        truncated = TruncYear('month') if bucket == 'year' else F('month')
+        amount = 'total'
+    else:
+        # Long windows reach back into archived transactions
+        sources = [
+            model.objects.filter(user=user, date__gte=first, date__lte=today)
+            for model in (Transaction, ArchivedTransaction)
+        ]
+        truncated = TruncWeek('date') if bucket == 'week' else F('date')
+        amount = 'amount'
+
+    group_by = ['bucket'] + ([split] if split else [])
+    grouped = []
+    for rows in sources:
+        if type != 'all':
+            rows = rows.filter(type=type)
+        grouped.extend(
+            rows.annotate(bucket=truncated)
+            .values(*group_by)
+            .annotate(total=Sum(amount))
+            .order_by()
+        )
+
+    totals = {}
+    breakdowns = {}
+    for row in grouped:
+        key = row['bucket']
+        totals[key] = totals.get(key, Decimal('0.00')) + row['total']
+        if split:
+            breakdown = breakdowns.setdefault(key, {})
+            name = _split_key(row, split)
+            breakdown[name] = breakdown.get(name, Decimal('0.00')) + row['total']
+
+    result = []
+    for step in range(window):
+        key = _shift(first, bucket, step)
+        item = {
+            'date': key,
+            'amount': str(totals.get(key, Decimal('0.00'))),
+        }
+        if split:
+            item['breakdown'] = {
+                name: str(total)
+                for name, total in sorted(breakdowns.get(key, {}).items())
+            }
+        result.append(item)
+    return result
+
+
+def user_budgets(user):
+    """Return the user's budgets as a list"""
+    return list(Budget.objects.filter(user=user))
+
+
+def overview_totals(user, first_day, budgets=()):
+    """
+    Return all-time totals, this month's spending and per-budget spending.
+
+    Everything is one conditional aggregate over the monthly rollup. Budget
+    spending is only included when ``budgets`` is given; otherwise use
+    ``month_spending_by_category`` for it.
+    """
+    this_month = Q(type='expense', month=first_day)
+    aggregates = {
+        'total_expenses': Sum('total', filter=Q(type='expense')),
+        'total_income': Sum('total', filter=Q(type='income')),
+        'this_month_spending': Sum('total', filter=this_month),
+    }
+    for index, budget in enumerate(budgets):
+        aggregates[f'budget_{index}'] = Sum(
+            'total',
+            filter=this_month & Q(category=budget.category)
+        )
+    totals = MonthlyCategoryTotal.objects.filter(user=user).aggregate(**aggregates)
+    totals['budget_spending'] = {
+        budget.category: totals.pop(f'budget_{index}')
+        for index, budget in enumerate(budgets)
+    }
+    return totals
+
+
+def month_spending_by_category(user, first_day):
+    """Return {category: total} of expenses for the month starting ``first_day``"""
+    # Summed (there is one row per category) so values are typed exactly
+    # like the conditional aggregates in overview_totals
+    return dict(
+        MonthlyCategoryTotal.objects.filter(
+            user=user,
+            type='expense',
+            month=first_day
+        ).values('category').annotate(spent=Sum('total')).values_list('category', 'spent')
+    )
+
+
+def dashboard_overview(budgets, totals, spending_by_category):
+    """Build the overview payload from budgets, totals and per-category spending"""
+    total_expenses = totals['total_expenses'] or Decimal('0.00')
+    total_income = totals['total_income'] or Decimal('0.00')
+    net_balance = total_income - total_expenses
+    this_month_spending = totals['this_month_spending'] or Decimal('0.00')
+
+    # Budget progress
+    budget_progress = []
+    for budget in budgets:
+        spending = spending_by_category.get(budget.category) or Decimal('0.00')
+
+        budget_progress.append({
+            'category': budget.category,
+            'limit': str(budget.limit_amount),
+            'spent': str(spending),
+            'percentage': float((spending / budget.limit_amount * 100)) if budget.limit_amount > 0 else 0,
+        })
+
+    return {
+        'total_expenses': str(total_expenses),
+        'total_income': str(total_income),
+        'net_balance': str(net_balance),
+        'this_month_spending': str(this_month_spending),
+        'budget_progress': budget_progress,
+    }
+
+
+def spending_breakdown(user, first_day):
+    """Return spending per category, with percentages, for the month starting ``first_day``"""
+    transactions = MonthlyCategoryTotal.objects.filter(
+        user=user,
+        type='expense',
+        month=first_day
+    ).values('category', 'total').order_by('category')
+
+    # Calculate total for percentage
+    total_spending = sum(t['total'] for t in transactions) or Decimal('1')
+
+    result = []
+    for item in transactions:
+        result.append({
+            'category': item['category'] or None,
+            'amount': str(item['total']),
+            'percentage': float((item['total'] / total_spending * 100)),
+        })
+    return result
+
+
+def recent_transactions(user, limit):
+    """Return the user's ``limit`` most recent transactions, serialized"""
+    transactions = transaction_rows(Transaction.objects.filter(
+        user=user
+    ).order_by('-date', '-created_at'))[:limit]
+    return serialize_transaction_rows(transactions)
@@ -0,0 +1,64 @@
+"""
+Archival of old transactions into ArchivedTransaction.
+
+``archive_batch`` moves up to ``batch_size`` transactions dated before a
+cutoff into the archive table in one database transaction, keeping their ids.
+If an archived row already has one of those ids the insert fails and the
+whole batch rolls back, so no transaction is deleted without being archived.
+``manage.py archive_transactions`` repeats it until nothing is left, so an
+interrupted run simply resumes where it stopped. The moved rows keep their
+share of the MonthlyCategoryTotal rollup, so dashboards, budgets and reports
+are unchanged, while the hot table and its indexes only hold recent activity.
+List and export endpoints include archived rows with ``?include_archived=true``.
+"""
+from datetime import date, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from .cache import bump_data_version
+from .models import ArchivedTransaction, Transaction
+from .signals import suppress_model_signals
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'type', 'category', 'amount', 'description', 'date', 'created_at', 'updated_at',
+)
+
+
+def archive_cutoff(days=None, today=None):
+    """Transactions dated before this are archived"""
+    if days is None:
+        days = settings.TRANSACTION_ARCHIVE_AFTER_DAYS
+    return (today or date.today()) - timedelta(days=days)
+
+
+def archive_batch(cutoff, batch_size, after_id=0):
+    """
+    Move the next batch of transactions dated before ``cutoff`` with an id
+    above ``after_id``; return the moved ids in ascending order (empty when
+    there is nothing left).
+    """
+    with transaction.atomic():
+        rows = list(
+            Transaction.objects.select_for_update()
+            .filter(date__lt=cutoff, id__gt=after_id)
+            .order_by('id')
+            .values(*ARCHIVE_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return []
+
+        # No ignore_conflicts: an id that is already archived must abort the
+        # batch rather than delete the hot row below without archiving it
+        ArchivedTransaction.objects.bulk_create([ArchivedTransaction(**row) for row in rows])
+        ids = [row['id'] for row in rows]
+        # The rows move rather than disappear: the rollup keeps their amounts,
+        # alerts stay as they are and no sync tombstones are written
+        with suppress_model_signals():
+            Transaction.objects.filter(pk__in=ids).delete()
+
+        # Listings change; aggregates do not
+        for user_id in {row['user_id'] for row in rows}:
+            transaction.on_commit(partial(bump_data_version, user_id))
+    return ids
@@ -0,0 +1,176 @@
+"""
+Async variants of the DashboardViewSet actions, for ASGI deployments.
+
+They are plain Django async views with the same URLs, authentication,
+conditional GET and response cache as the viewset. Django's async ORM still
+runs every query on the request's single sync thread, so queries that do not
+depend on each other are instead dispatched to a small thread pool, each
+thread with its own database connection, and awaited together.
+
+Enabled with ``ASYNC_DASHBOARD=True`` (see ``api.urls``); the pool size is
+``ASYNC_QUERY_THREADS``. Like the viewset, queries are routed to a read
+replica when one is configured (see ``api.routers``).
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .analytics import (
+    dashboard_overview,
+    month_spending_by_category,
+    overview_totals,
+    parse_trend_params,
+    recent_transactions,
+    spending_breakdown,
+    spending_trend,
+    user_budgets,
+)
+from .cache import async_cached_per_user
+from .conditional import async_conditional_on_user_data
+from .routers import replica_for, using_database
+
+query_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.ASYNC_QUERY_THREADS),
+    thread_name_prefix='api-query',
+)
+
+
+def _run_query(func, *args):
+    # Pool threads never see request_finished, so expired or broken
+    # connections are cleaned up here instead
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_query(func, *args):
+    """
+    Run a sync ORM function in the query pool.
+
+    With ``ASYNC_QUERY_THREADS=0`` it runs on the request's sync thread
+    instead, which is needed to see uncommitted data (e.g. in tests).
+    """
+    if not settings.ASYNC_QUERY_THREADS:
+        return await sync_to_async(func)(*args)
+    return await sync_to_async(_run_query, thread_sensitive=False, executor=query_executor)(func, *args)
+
+
+async def run_concurrently(*calls):
+    """Run (func, *args) tuples in the query pool concurrently and return their results"""
+    return await asyncio.gather(*(run_query(*call) for call in calls))
+
+
+def render(data, status=200):
+    """Render response data with the API's JSON renderer, as the viewset would"""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), status=status, content_type='application/json')
+
+
+def _authenticate(request):
+    """
+    Authenticate with the DRF authentication classes.
+
+    Returns None on success (``request.user`` is then set), otherwise the
+    401/403 response DRF would have sent.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    try:
+        user = drf_request.user
+        if user and user.is_authenticated:
+            return None
+        exc = exceptions.NotAuthenticated()
+    except exceptions.APIException as error:
+        exc = error
+
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    authenticate_header = None
+    if drf_request.authenticators:
+        authenticate_header = drf_request.authenticators[0].authenticate_header(drf_request)
+    if authenticate_header:
+        response = render(data, status=401)
+        response['WWW-Authenticate'] = authenticate_header
+    else:
+        response = render(data, status=403)
+    return response
+
+
+def dashboard_action(name):
+    """
+    Turn an async function returning response data into a GET-only,
+    authenticated, conditional and cached dashboard endpoint.
+    """
+    def decorator(compute):
+        cached = async_cached_per_user(f'DashboardViewSet.{name}', render)(compute)
+        conditional = async_conditional_on_user_data(cached)
+
+        @wraps(compute)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return render({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+            error = await sync_to_async(_authenticate)(request)
+            if error is not None:
+                return error
+            # Part of the ETag fingerprint, as set by DRF content negotiation
+            request.accepted_media_type = 'application/json'
+            # The routing context is copied into the query pool's threads
+            database = await sync_to_async(replica_for)(request.user)
+            with using_database(database):
+                return await conditional(request, *args, **kwargs)
+
+        return view
+
+    return decorator
+
+
+@dashboard_action('overview')
+async def overview(request):
+    """Get dashboard overview with key metrics"""
+    first_day = datetime.now().date().replace(day=1)
+
+    # Budgets, totals and this month's per-category spending are independent
+    budgets, totals, spending_by_category = await run_concurrently(
+        (user_budgets, request.user),
+        (overview_totals, request.user, first_day),
+        (month_spending_by_category, request.user, first_day),
+    )
+    return dashboard_overview(budgets, totals, spending_by_category)
+
+
+@dashboard_action('spending_breakdown')
+async def spending_breakdown_view(request):
+    """Get spending breakdown by category for current month"""
+    first_day = datetime.now().date().replace(day=1)
+    return await run_query(spending_breakdown, request.user, first_day)
+
+
+@dashboard_action('spending_trend')
+async def spending_trend_view(request):
+    """Get the spending trend, gap-filled, for the last ``window`` buckets"""
+    options, error = parse_trend_params(request.GET)
+    if error:
+        return render({'error': error}, status=400)
+
+    today = datetime.now().date()
+    return await run_query(lambda: spending_trend(request.user, today=today, **options))
+
+
+@dashboard_action('recent_transactions')
+async def recent_transactions_view(request):
+    """Get recent transactions"""
+    limit = int(request.GET.get('limit', 10))
+    return await run_query(recent_transactions, request.user, limit)
@@ -0,0 +1,83 @@
+"""
+JWT authentication that resolves the token's user from the cache.
+
+SimpleJWT's ``JWTAuthentication`` loads the user by id on every request. The
+user is instead cached for ``AUTH_USER_CACHE_TIMEOUT`` seconds and dropped
+whenever the User row is saved or deleted (see ``api.signals``), which covers
+profile updates, deactivation and password changes made through the ORM.
+Inactive users are never cached, and the active and revoked-token checks run
+on every request exactly as in SimpleJWT.
+
+Only ``CACHED_USER_FIELDS`` are cached, never the password hash; the User
+is rebuilt from them with every other field deferred (loaded on access).
+
+The cache is used whenever it is shared by the web workers: a file or redis
+cache, or the local-memory cache with a single worker. With local memory a
+change made by another process (``manage.py``) is not seen until the entry
+expires.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache import cache_is_shared
+
+AUTH_USER_KEY = 'api:auth-user:{user_id}'
+# What permission checks and the profile endpoint read
+CACHED_USER_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def invalidate_cached_user(user_id):
+    """Drop a user from the authentication cache"""
+    cache.delete(AUTH_USER_KEY.format(user_id=user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication with a short-lived per-user cache in front of the User lookup"""
+
+    def get_user(self, validated_token):
+        if not settings.AUTH_USER_CACHE_TIMEOUT or not cache_is_shared():
+            # Invalidation from other workers would not reach this one
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            ) from e
+
+        key = AUTH_USER_KEY.format(user_id=user_id)
+        entry = cache.get(key)
+        if entry is None:
+            # Raises for missing, inactive or revoked users, so only users
+            # that passed every check are cached
+            user = super().get_user(validated_token)
+            cache.set(key, self.cache_entry(user), timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+
+        # from_db takes the values in model field order
+        fields = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in entry]
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, fields, [entry[field] for field in fields])
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != entry['password_fingerprint']:
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code='password_changed'
+                )
+
+        return user
+
+    def cache_entry(self, user):
+        entry = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # The value revocable tokens carry, not the hash itself
+            entry['password_fingerprint'] = get_md5_hash_password(user.password)
+        return entry
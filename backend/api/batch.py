@@ -0,0 +1,176 @@
+"""
+Batched create/update/delete of transactions and budgets.
+
+A batch is validated in full with the regular serializers before anything is
+written; if any operation is invalid nothing is applied. Valid batches run
+in one database transaction: deletes first (so a budget category can be
+freed and re-created in the same batch), then ``bulk_update`` and
+``bulk_create`` per model. Bulk writes bypass model signals, so
+``transactions_bulk_changed`` (with the affected dates) and
+``budgets_bulk_changed`` are sent instead.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Budget, Transaction
+from .serializers import BudgetSerializer, TransactionSerializer
+from .signals import budgets_bulk_changed, transactions_bulk_changed
+from .sync import pending_write
+
+BATCH_OPS = ('create', 'update', 'delete')
+BATCH_MODELS = {
+    'transaction': (Transaction, TransactionSerializer),
+    'budget': (Budget, BudgetSerializer),
+}
+OP_STATUS = {'create': 201, 'update': 200, 'delete': 204}
+
+
+class BatchError(Exception):
+    """Raised when a batch request is malformed or cannot be applied"""
+
+
+def _parse(operations):
+    """Check the shape of every operation; return {index: errors} for bad ones"""
+    if not isinstance(operations, list) or not operations:
+        raise BatchError('operations must be a non-empty list')
+    if len(operations) > settings.BATCH_MAX_OPERATIONS:
+        raise BatchError(f'A batch can contain at most {settings.BATCH_MAX_OPERATIONS} operations')
+
+    errors = {}
+    targets = set()
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            errors[index] = {'operation': ['Must be an object.']}
+            continue
+        op_errors = {}
+        if operation.get('op') not in BATCH_OPS:
+            op_errors['op'] = [f"Must be one of: {', '.join(BATCH_OPS)}."]
+        if operation.get('model') not in BATCH_MODELS:
+            op_errors['model'] = [f"Must be one of: {', '.join(BATCH_MODELS)}."]
+        if operation.get('op') in ('update', 'delete'):
+            target = (operation.get('model'), operation.get('id'))
+            if not isinstance(target[1], int) or isinstance(target[1], bool):
+                op_errors['id'] = ['A valid integer is required.']
+            elif target in targets:
+                op_errors['id'] = ['Object appears in more than one operation.']
+            targets.add(target)
+        if operation.get('op') in ('create', 'update') and not isinstance(operation.get('data'), dict):
+            op_errors['data'] = ['Must be an object.']
+        if op_errors:
+            errors[index] = op_errors
+    return errors
+
+
+def run_batch(user, operations):
+    """
+    Validate and apply a list of operations for ``user``.
+
+    Each operation is ``{'op': 'create', 'model': 'transaction', 'data': {...}}``,
+    ``{'op': 'update', 'model': ..., 'id': 1, 'data': {...}}`` (all fields, as
+    with PUT) or ``{'op': 'delete', 'model': ..., 'id': 1}``. Returns
+    ``(results, errors)``: per-operation results in request order, or the
+    per-operation validation errors when nothing was applied.
+    """
+    errors = _parse(operations)
+    well_formed = [
+        (index, operation) for index, operation in enumerate(operations)
+        if index not in errors
+    ]
+
+    # One query per model for every object that is updated or deleted
+    existing = {}
+    for name, (model, _) in BATCH_MODELS.items():
+        ids = [
+            operation['id'] for index, operation in well_formed
+            if operation['model'] == name and operation['op'] != 'create'
+        ]
+        existing[name] = model.objects.filter(user=user, id__in=ids).in_bulk() if ids else {}
+
+    validated = []
+    for index, operation in well_formed:
+        name, op = operation['model'], operation['op']
+        serializer_class = BATCH_MODELS[name][1]
+        instance = None
+        if op != 'create':
+            instance = existing[name].get(operation['id'])
+            if instance is None:
+                errors[index] = {'id': ['Not found.']}
+                continue
+        if op == 'delete':
+            validated.append({'operation': operation, 'instance': instance, 'serializer': None})
+            continue
+        serializer = serializer_class(instance, data=operation['data'])
+        if serializer.is_valid():
+            validated.append({'operation': operation, 'instance': instance, 'serializer': serializer})
+        else:
+            errors[index] = serializer.errors
+
+    if errors:
+        return None, [{'index': index, 'errors': errors[index]} for index in sorted(errors)]
+
+    try:
+        with pending_write(user.pk), transaction.atomic():
+            _apply(user, validated)
+    except IntegrityError:
+        raise BatchError('Batch conflicts with existing data (e.g. two budgets for one category)')
+
+    results = []
+    for item in validated:
+        operation = item['operation']
+        result = {'op': operation['op'], 'model': operation['model'], 'status': OP_STATUS[operation['op']]}
+        if operation['op'] == 'delete':
+            result['id'] = operation['id']
+        else:
+            result['data'] = BATCH_MODELS[operation['model']][1](item['instance']).data
+        results.append(result)
+    return results, None
+
+
+def _apply(user, validated):
+    now = timezone.now()
+    touched_dates = set()
+    changed = set()
+
+    for name, (model, _) in BATCH_MODELS.items():
+        deletes, updates, creates = [], [], []
+        update_fields = {'updated_at'}
+        for item in validated:
+            operation, instance = item['operation'], item['instance']
+            if operation['model'] != name:
+                continue
+            if operation['op'] == 'delete':
+                deletes.append(instance.pk)
+                continue
+
+            data = item['serializer'].validated_data
+            if operation['op'] == 'update':
+                if name == 'transaction':
+                    touched_dates.add(instance.date)
+                for field, value in data.items():
+                    setattr(instance, field, value)
+                    update_fields.add(field)
+                # bulk_update does not apply auto_now
+                instance.updated_at = now
+                updates.append(instance)
+            else:
+                instance = item['instance'] = model(user=user, **data)
+                creates.append(instance)
+            if name == 'transaction':
+                touched_dates.add(instance.date)
+
+        # Deletes go through the ORM so per-row signals keep the rollup
+        # and cache in step
+        if deletes:
+            model.objects.filter(user=user, id__in=deletes).delete()
+        if updates:
+            model.objects.bulk_update(updates, sorted(update_fields))
+            changed.add(name)
+        if creates:
+            model.objects.bulk_create(creates)
+            changed.add(name)
+
+    if 'transaction' in changed:
+        transactions_bulk_changed.send(sender=Transaction, user=user, dates=touched_dates)
+    if 'budget' in changed:
+        budgets_bulk_changed.send(sender=Budget, user=user)
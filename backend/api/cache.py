@@ -0,0 +1,131 @@
+"""
+Per-user response cache for read-only dashboard and budget endpoints.
+
+Every user has a data version stored in the cache. Cached responses are keyed
+by that version, and the version is replaced whenever one of the user's
+Transaction or Budget rows is written (see ``api.signals``), so stale entries
+are never read again and simply expire. The version is the time of that write
+in nanoseconds, which ``api.routers`` uses to keep recent writers on the
+primary database.
+"""
+import hashlib
+import time
+from datetime import date
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponseBase
+from rest_framework.response import Response
+
+DATA_VERSION_KEY = 'api:data-version:{user_id}'
+RESPONSE_KEY = 'api:response:{user_id}:{version}:{view}:{today}:{params}'
+
+
+def cache_is_per_process():
+    """True when the cache is local memory, which no other process can see"""
+    return settings.CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache'
+
+
+def cache_is_shared():
+    """True when every web worker sees the same cache"""
+    return not cache_is_per_process() or settings.WEB_CONCURRENCY <= 1
+
+
+def get_data_version(user_id):
+    """Return the current data version for a user, initialising it if missing"""
+    key = DATA_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached response for a user"""
+    cache.set(DATA_VERSION_KEY.format(user_id=user_id), time.time_ns(), timeout=None)
+
+
+def seconds_since_write(user_id):
+    """Seconds since the user's data version was last bumped"""
+    return (time.time_ns() - get_data_version(user_id)) / 1e9
+
+
+def _response_key(request, view_label):
+    params = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        version=get_data_version(request.user.pk),
+        view=view_label,
+        today=date.today().isoformat(),
+        params=params,
+    )
+
+
+def _lookup(request, view_label):
+    """Return (key, cached data or None) and count the hit or miss"""
+    key = _response_key(request, view_label)
+    data = cache.get(key)
+    # Counted in process, like the request metrics: no cache write per
+    # request. Imported here because api.metrics loads DRF's views, which
+    # load the authentication classes, which import this module
+    from .metrics import registry
+    registry.count_cache_lookup('misses' if data is None else 'hits')
+    return key, data
+
+
+def cached_per_user(view):
+    """
+    Cache a viewset action's response data per user and data version.
+
+    The key also includes today's date (month-to-date figures roll over) and
+    the query string, so parameterised requests are cached separately.
+    """
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key, data = _lookup(request, f'{type(self).__name__}.{view.__name__}')
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = view(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=settings.API_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    return wrapper
+
+
+def async_cached_per_user(view_label, render):
+    """
+    Async counterpart of ``cached_per_user`` for plain async views.
+
+    The wrapped view returns response data (or an HttpResponse, which is
+    passed through uncached) and ``render`` turns data into a response.
+    Entries are shared with the viewset action named by ``view_label``
+    (e.g. ``'DashboardViewSet.overview'``).
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key, data = await sync_to_async(_lookup)(request, view_label)
+            if data is not None:
+                response = render(data)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            data = await view(request, *args, **kwargs)
+            if isinstance(data, HttpResponseBase):
+                return data
+            await cache.aset(key, data, timeout=settings.API_CACHE_TIMEOUT)
+            response = render(data)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    return decorator
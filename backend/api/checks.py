@@ -0,0 +1,52 @@
+"""
+System checks for the cache and database settings the API depends on.
+"""
+from django.conf import settings
+from django.core import checks
+
+from .cache import cache_is_per_process, cache_is_shared
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Cache invalidation must reach every web worker"""
+    if cache_is_shared():
+        return []
+    return [
+        checks.Error(
+            'The local-memory cache is per process, but WEB_CONCURRENCY runs several workers: '
+            'a write only invalidates the cached responses and users of the worker that took it.',
+            hint='Set CACHE_BACKEND=file (workers on one host) or CACHE_BACKEND=redis.',
+            id='api.E001',
+        )
+    ]
+
+
+@checks.register(checks.Tags.caches, checks.Tags.database)
+def check_replica_cache(app_configs, **kwargs):
+    """Read-your-writes on replicas needs every process to see each write"""
+    if not settings.REPLICA_DATABASES or not cache_is_per_process():
+        return []
+    return [
+        checks.Error(
+            'REPLICA_DATABASE_URLS is set, but the local-memory cache is per process: '
+            'a worker that did not take a write would send the user\'s next reads to a lagging replica.',
+            hint='Set CACHE_BACKEND=file (processes on one host) or CACHE_BACKEND=redis.',
+            id='api.E002',
+        )
+    ]
+
+
+@checks.register(checks.Tags.database)
+def check_connection_pool(app_configs, **kwargs):
+    """DB_POOL needs the psycopg 3 driver and psycopg_pool"""
+    if not settings.DB_POOL or settings.DB_POOL_AVAILABLE:
+        return []
+    return [
+        checks.Error(
+            'DB_POOL=True, but psycopg 3 with psycopg_pool is not installed: '
+            'connections would not be pooled.',
+            hint='pip install "psycopg[binary,pool]", or unset DB_POOL.',
+            id='api.E003',
+        )
+    ]
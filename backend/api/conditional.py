@@ -0,0 +1,87 @@
+"""
+Conditional GET support (ETag / Last-Modified) for per-user API resources.
+
+The validators come from the user's data version in the cache (see
+``api.cache``), which is replaced after every committed change to their
+transactions or budgets, deletions included. No query runs, so a matching
+``If-None-Match`` or ``If-Modified-Since`` answers ``304 Not Modified`` (and a
+cached response is served) without touching the database.
+
+The version is the time of the user's last write, which is also sent as
+Last-Modified. If the version is evicted from the cache it restarts at the
+current time, which only makes clients fetch once more.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache import get_data_version
+
+
+def user_data_validators(request):
+    """Return (etag, last_modified) for the requesting user's data, memoized per request"""
+    validators = getattr(request, '_user_data_validators', None)
+    if validators is not None:
+        return validators
+
+    user = request.user
+    version = get_data_version(user.pk)
+    last_modified = datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
+
+    # Dashboard figures depend on the current month, and each renderer
+    # produces a different representation of the same data
+    fingerprint = ':'.join(str(part) for part in (
+        user.pk,
+        version,
+        datetime.now().date(),
+        getattr(request, 'accepted_media_type', ''),
+    ))
+    etag = hashlib.md5(fingerprint.encode()).hexdigest()
+
+    request._user_data_validators = (etag, last_modified)
+    return request._user_data_validators
+
+
+def _etag(request, *args, **kwargs):
+    return user_data_validators(request)[0]
+
+
+def _last_modified(request, *args, **kwargs):
+    return user_data_validators(request)[1]
+
+
+def conditional_on_user_data(view):
+    """Answer conditional GETs for a viewset action from the user's data validators"""
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        def handler(request, *args, **kwargs):
+            return view(self, request, *args, **kwargs)
+
+        response = condition(etag_func=_etag, last_modified_func=_last_modified)(handler)(
+            request, *args, **kwargs
+        )
+        # Responses are per user, and must be revalidated before reuse
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
+
+
+def async_conditional_on_user_data(view):
+    """Async counterpart of ``conditional_on_user_data`` for plain async views"""
+    conditional_view = condition(etag_func=_etag, last_modified_func=_last_modified)(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # Compute the validators off the event loop; condition() then reads
+        # the memoized values
+        await sync_to_async(user_data_validators)(request)
+        response = await conditional_view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    return wrapper
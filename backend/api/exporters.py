@@ -0,0 +1,75 @@
+"""
+Streaming export of a user's transactions.
+
+Rows are pulled from the database with ``values_list().iterator()`` and
+encoded one at a time, so memory use stays flat no matter how many rows a
+user has. Writers take one or more querysets (e.g. hot and archived
+transactions) and stream them one after the other.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+EXPORT_FIELDS = ('id', 'type', 'category', 'amount', 'description', 'date', 'created_at', 'updated_at')
+
+
+class _Echo:
+    """File-like object whose write() hands back the value, for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def _format_datetime(value):
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _export_values(row):
+    row_id, type, category, amount, description, row_date, created_at, updated_at = row
+    return (
+        row_id,
+        type,
+        category,
+        str(amount),
+        description,
+        row_date.isoformat(),
+        _format_datetime(created_at),
+        _format_datetime(updated_at),
+    )
+
+
+def _iter_rows(querysets):
+    for queryset in querysets:
+        rows = queryset.values_list(*EXPORT_FIELDS).iterator(
+            chunk_size=settings.TRANSACTION_EXPORT_CHUNK_SIZE
+        )
+        for row in rows:
+            yield _export_values(row)
+
+
+def iter_csv(*querysets):
+    """Yield CSV lines, header first"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in _iter_rows(querysets):
+        yield writer.writerow(row)
+
+
+def iter_ndjson(*querysets):
+    """Yield one JSON object per line"""
+    for row in _iter_rows(querysets):
+        yield json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+EXPORT_WRITERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+}
@@ -0,0 +1,249 @@
+"""
+Bulk import of transactions from bank export files.
+
+Uploaded files are read as a stream, one row at a time, so memory use does not
+depend on the size of the export. Rows are validated against the Transaction
+choices and written with ``bulk_create`` in chunks inside a single database
+transaction.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Transaction
+from .signals import transactions_bulk_changed
+from .sync import pending_write
+
+IMPORT_FORMATS = ('csv', 'ofx', 'qif')
+
+CATEGORY_VALUES = {value for value, label in Transaction.ALL_CATEGORIES}
+CATEGORY_LOOKUP = {
+    **{label.lower(): value for value, label in Transaction.ALL_CATEGORIES},
+    **{value.lower(): value for value in CATEGORY_VALUES},
+}
+TYPE_VALUES = {value for value, label in Transaction.TRANSACTION_TYPE_CHOICES}
+DESCRIPTION_MAX_LENGTH = Transaction._meta.get_field('description').max_length
+
+QIF_DATE_FORMATS = ('%m/%d/%Y', "%m/%d'%y", '%m/%d/%y', '%d/%m/%Y', '%Y-%m-%d')
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class ImportFileError(Exception):
+    """Raised when an uploaded file cannot be read at all"""
+
+
+def detect_format(filename, requested=None):
+    """Resolve the import format from an explicit choice or the file extension"""
+    file_format = (requested or filename.rsplit('.', 1)[-1]).lower()
+    if file_format not in IMPORT_FORMATS:
+        raise ImportFileError(f"Unsupported file format. Use one of: {', '.join(IMPORT_FORMATS)}")
+    return file_format
+
+
+def iter_csv_rows(stream):
+    """Yield (row number, raw row) pairs from a CSV file with a header line"""
+    reader = csv.DictReader(stream)
+    columns = {(name or '').strip().lower() for name in reader.fieldnames or []}
+    if not {'date', 'amount'} <= columns:
+        raise ImportFileError('CSV header must include date and amount columns')
+    for row in reader:
+        yield reader.line_num, {
+            (key or '').strip().lower(): (value or '').strip()
+            for key, value in row.items()
+        }
+
+
+def iter_ofx_rows(stream):
+    """Yield (row number, raw row) pairs for each STMTTRN block of an OFX file"""
+    current = None
+    index = 0
+    for line in stream:
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing and current is not None:
+                    index += 1
+                    yield index, _ofx_row(current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing:
+                current[tag] = value.strip()
+
+
+def _ofx_row(fields):
+    amount = fields.get('TRNAMT', '')
+    posted = fields.get('DTPOSTED', '')[:8]
+    return {
+        'date': f'{posted[:4]}-{posted[4:6]}-{posted[6:8]}' if len(posted) == 8 else posted,
+        'amount': amount,
+        'description': fields.get('NAME') or fields.get('MEMO', ''),
+    }
+
+
+def iter_qif_rows(stream):
+    """Yield (row number, raw row) pairs for each record of a QIF file"""
+    current = {}
+    index = 0
+    for line in stream:
+        line = line.strip()
+        if not line or line.startswith('!'):
+            continue
+        code, value = line[0], line[1:].strip()
+        if code == '^':
+            if current:
+                index += 1
+                yield index, current
+            current = {}
+        elif code == 'D':
+            current['date'] = value
+        elif code in ('T', 'U'):
+            current['amount'] = value
+        elif code == 'P':
+            current['description'] = value
+        elif code == 'M':
+            current.setdefault('description', value)
+        elif code == 'L':
+            current['category'] = value
+    if current:
+        yield index + 1, current
+
+
+ROW_READERS = {
+    'csv': iter_csv_rows,
+    'ofx': iter_ofx_rows,
+    'qif': iter_qif_rows,
+}
+
+
+def _parse_date(value, date_formats):
+    for date_format in date_formats:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def validate_row(raw, default_category=None, date_formats=('%Y-%m-%d',)):
+    """
+    Turn a raw row into Transaction field values.
+
+    Returns ``(values, errors)``; ``values`` is None when ``errors`` is not
+    empty. Signed amounts without an explicit type are imported as expenses
+    when negative and income otherwise.
+    """
+    errors = {}
+
+    row_date = _parse_date(raw.get('date', ''), date_formats)
+    if row_date is None:
+        errors['date'] = 'Enter a valid date.'
+
+    amount = None
+    try:
+        amount = Decimal(raw.get('amount', '').replace(',', ''))
+    except InvalidOperation:
+        pass
+    if amount is None or not amount.is_finite():
+        amount = None
+        errors['amount'] = 'A valid number is required.'
+
+    type = raw.get('type', '').lower()
+    if amount is not None:
+        if not type:
+            type = 'expense' if amount < 0 else 'income'
+        amount = abs(amount).quantize(Decimal('0.01'))
+        if amount >= Decimal('1e8'):
+            errors['amount'] = 'Ensure that there are no more than 10 digits in total.'
+    if type not in TYPE_VALUES and (type or amount is not None):
+        errors['type'] = f'"{type}" is not a valid choice.'
+
+    category = raw.get('category') or default_category or ''
+    category = CATEGORY_LOOKUP.get(category.strip().lower())
+    if category is None:
+        errors['category'] = 'Category is required for all transactions.'
+
+    description = raw.get('description', '')
+    if len(description) > DESCRIPTION_MAX_LENGTH:
+        errors['description'] = f'Ensure this field has no more than {DESCRIPTION_MAX_LENGTH} characters.'
+
+    if errors:
+        return None, errors
+    return {
+        'type': type,
+        'category': category,
+        'amount': amount,
+        'description': description,
+        'date': row_date,
+    }, {}
+
+
+def import_transactions(user, upload, file_format, default_category=None,
+                        date_format=None, batch_size=None, skip_invalid=False):
+    """
+    Stream ``upload`` into Transaction rows for ``user``.
+
+    Valid rows are written in ``batch_size`` chunks. Unless ``skip_invalid``
+    is set, any invalid row rolls the whole import back. Returns a report
+    dict with the number of rows created and the per-row errors.
+    """
+    batch_size = batch_size or settings.TRANSACTION_IMPORT_BATCH_SIZE
+    max_errors = settings.TRANSACTION_IMPORT_MAX_ERRORS
+    if date_format:
+        date_formats = (date_format,)
+    elif file_format == 'qif':
+        date_formats = QIF_DATE_FORMATS
+    else:
+        date_formats = ('%Y-%m-%d',)
+
+    created = 0
+    error_count = 0
+    errors = []
+    touched_dates = set()
+    batch = []
+
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', errors='replace', newline='')
+    try:
+        # A long import must not let delta sync tokens pass its rows
+        with pending_write(user.pk), transaction.atomic():
+            for row_number, raw in ROW_READERS[file_format](stream):
+                values, row_errors = validate_row(raw, default_category, date_formats)
+                if row_errors:
+                    error_count += 1
+                    if len(errors) < max_errors:
+                        errors.append({'row': row_number, 'errors': row_errors})
+                    continue
+
+                batch.append(Transaction(user=user, **values))
+                touched_dates.add(values['date'])
+                if len(batch) >= batch_size:
+                    Transaction.objects.bulk_create(batch)
+                    created += len(batch)
+                    batch = []
+
+            if batch:
+                Transaction.objects.bulk_create(batch)
+                created += len(batch)
+
+            if error_count and not skip_invalid:
+                transaction.set_rollback(True)
+                created = 0
+            elif created:
+                transactions_bulk_changed.send(
+                    sender=Transaction, user=user, dates=touched_dates
+                )
+    except csv.Error as exc:
+        raise ImportFileError(f'Could not read file: {exc}')
+    finally:
+        stream.detach()
+
+    return {
+        'created': created,
+        'error_count': error_count,
+        'errors': errors,
+    }
@@ -0,0 +1,161 @@
+"""
+Database-backed background jobs.
+
+Work that is too slow for a web request is queued as a Job row with
+``enqueue`` and run by ``manage.py run_jobs``. There is no broker: workers
+poll for the oldest queued job and claim it with a conditional UPDATE
+(``status='queued'`` to ``'running'``), so concurrent workers on SQLite or
+PostgreSQL never run the same job twice.
+
+While a job runs its worker refreshes ``heartbeat_at``; a running job whose
+heartbeat stops for JOB_STALE_AFTER_SECONDS lost its worker and is queued
+again. Each claim is identified by the job's attempt number, and a result
+is only stored while that claim still holds, so a worker that was presumed
+dead cannot overwrite a later attempt.
+
+Handlers are registered with ``@job_handler('name')`` and are called with
+the job's user and params; whatever JSON-serializable value they return is
+stored as the job result. Handlers registered with ``read_only=True`` read
+from a replica when one is configured (see ``api.routers``).
+"""
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .routers import replica_reads, using_database
+
+JOB_HANDLERS = {}
+READ_ONLY_JOBS = set()
+
+
+def job_handler(kind, read_only=False):
+    """Register a function as the handler for jobs of ``kind``"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        if read_only:
+            READ_ONLY_JOBS.add(kind)
+        return func
+    return decorator
+
+
+def enqueue(kind, user=None, **params):
+    """
+    Queue a job, or return the identical one already queued or running.
+
+    Repeated requests for the same report therefore share one job.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f'Unknown job kind: {kind}')
+    pending = Job.objects.filter(
+        user=user, kind=kind, params=params, status__in=('queued', 'running')
+    ).first()
+    if pending is not None:
+        return pending
+    return Job.objects.create(user=user, kind=kind, params=params)
+
+
+def claim_next():
+    """Atomically claim the oldest queued job; return it, or None when the queue is empty"""
+    while True:
+        candidate = (
+            Job.objects.filter(status='queued')
+            .order_by('created_at', 'id')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if candidate is None:
+            return None
+        now = timezone.now()
+        claimed = Job.objects.filter(pk=candidate, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=candidate)
+        # Another worker claimed it first; try the next one
+
+
+def _claim(job):
+    """The job's row, as long as it is still running under this attempt"""
+    return Job.objects.filter(pk=job.pk, status='running', attempts=job.attempts)
+
+
+@contextmanager
+def heartbeat(job):
+    """Refresh the job's heartbeat every JOB_HEARTBEAT_SECONDS until the block exits"""
+    stopped = threading.Event()
+
+    def beat():
+        try:
+            while not stopped.wait(settings.JOB_HEARTBEAT_SECONDS):
+                _claim(job).update(heartbeat_at=timezone.now())
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its result or error.
+
+    Nothing is recorded if the claim was lost meanwhile (the job was
+    requeued as stale); the job is then returned as currently stored.
+    """
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise ValueError(f'Unknown job kind: {job.kind}')
+        routing = replica_reads(job.user) if job.kind in READ_ONLY_JOBS else using_database(None)
+        with heartbeat(job), routing:
+            job.result = handler(job.user, **job.params)
+        job.status = 'succeeded'
+        job.error = ''
+    except Exception:
+        job.status = 'failed'
+        job.error = traceback.format_exc()[-settings.JOB_ERROR_MAX_LENGTH:]
+    job.finished_at = timezone.now()
+    recorded = _claim(job).update(
+        status=job.status, result=job.result, error=job.error, finished_at=job.finished_at
+    )
+    if not recorded:
+        job.refresh_from_db()
+    return job
+
+
+def requeue_stale():
+    """
+    Requeue running jobs whose heartbeat stopped (their worker died), failing
+    those that have used up JOB_MAX_ATTEMPTS; return how many jobs were touched.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER_SECONDS)
+    stale = Job.objects.filter(
+        # Jobs claimed before heartbeats existed only have started_at
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status='running',
+    )
+    failed = stale.filter(attempts__gte=settings.JOB_MAX_ATTEMPTS).update(
+        status='failed', error='Worker stopped while running the job', finished_at=timezone.now()
+    )
+    return failed + stale.update(status='queued', started_at=None, heartbeat_at=None)
+
+
+def purge_finished():
+    """Delete finished jobs older than JOB_RETENTION_DAYS; return how many"""
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    deleted, _ = Job.objects.filter(
+        status__in=('succeeded', 'failed'), finished_at__lt=cutoff
+    ).delete()
+    return deleted
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from api.archive import archive_batch, archive_cutoff
+from api.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Move transactions older than TRANSACTION_ARCHIVE_AFTER_DAYS into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=settings.TRANSACTION_ARCHIVE_AFTER_DAYS,
+            help='Archive transactions dated more than this many days ago',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.TRANSACTION_ARCHIVE_BATCH_SIZE,
+            help='Transactions moved per database transaction',
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help='Stop after this many batches (run again to continue)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--older-than-days and --batch-size must be at least 1')
+
+        cutoff = archive_cutoff(options['older_than_days'])
+        if options['dry_run']:
+            count = Transaction.objects.filter(date__lt=cutoff).count()
+            self.stdout.write(f'{count} transactions dated before {cutoff} would be archived')
+            return
+
+        moved = batches = last_id = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            try:
+                ids = archive_batch(cutoff, options['batch_size'], after_id=last_id)
+            except IntegrityError as error:
+                raise CommandError(
+                    f'Archived {moved} transactions, then stopped: a transaction after id {last_id} '
+                    f'is already in the archive table ({error}). Nothing in that batch was moved.'
+                )
+            if not ids:
+                break
+            moved += len(ids)
+            batches += 1
+            last_id = ids[-1]
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Archived {moved} transactions (up to id {last_id})')
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} transactions dated before {cutoff}'))
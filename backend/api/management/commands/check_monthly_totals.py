@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.rollups import find_rollup_mismatches, rebuild_monthly_totals
+
+
+class Command(BaseCommand):
+    help = 'Verify the MonthlyCategoryTotal rollup table against transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only check rows for the user with this email',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rebuild the rollup for every user with mismatches',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        mismatches = find_rollup_mismatches(user=user)
+        if not mismatches:
+            self.stdout.write(self.style.SUCCESS('Monthly totals are consistent'))
+            return
+
+        for row in mismatches:
+            self.stdout.write(
+                f"user={row['user_id']} month={row['month']:%Y-%m} "
+                f"type={row['type']} category={row['category'] or '-'}: "
+                f"expected {row['expected_total']} ({row['expected_count']}), "
+                f"found {row['actual_total']} ({row['actual_count']})"
+            )
+
+        if options['fix']:
+            for user_id in sorted({row['user_id'] for row in mismatches}):
+                rebuild_monthly_totals(user=user_id)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {len(mismatches)} mismatched rows'))
+            return
+
+        raise CommandError(f'{len(mismatches)} monthly total rows are inconsistent')
@@ -0,0 +1,116 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from api.cache import bump_data_version
+from api.models import Budget, Transaction
+from api.sync import encode_sync_token
+
+# Endpoints whose queries must be served from indexes
+CHECKED_ENDPOINTS = (
+    ('dashboard-overview', {}),
+    ('dashboard-spending-breakdown', {}),
+    ('dashboard-spending-trend', {}),
+    ('dashboard-recent-transactions', {}),
+    ('budget-list', {}),
+    ('budget-spending-vs-budget', {}),
+    ('transaction-list', {}),
+    ('transaction-list', {'pagination': 'cursor'}),
+    ('transaction-list', {'pagination': 'cursor', 'include_archived': 'true'}),
+    ('transaction-by-category', {'category': 'food'}),
+    ('transaction-by-date-range', {'start_date': '2025-01-01', 'end_date': '2025-12-31'}),
+    ('transaction-expenses-this-month', {}),
+    ('sync-list', {'since': encode_sync_token(timezone.now() - timedelta(days=1))}),
+    ('alert-list', {}),
+)
+GUARDED_TABLES = (
+    'api_transaction', 'api_archivedtransaction', 'api_budget', 'api_monthlycategorytotal',
+    'api_tombstone', 'api_budgetalert', 'api_pendingwrite',
+)
+
+# SQLite before 3.36 prints "SCAN TABLE x"
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?:TABLE )?(\w+)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN every query issued by the dashboard, budget and listing endpoints and fail on full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to check')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every query plan')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor == 'sqlite':
+            explain_prefix, full_scan = 'EXPLAIN QUERY PLAN ', SQLITE_FULL_SCAN
+        elif connection.vendor == 'postgresql':
+            explain_prefix, full_scan = 'EXPLAIN ', POSTGRES_FULL_SCAN
+        else:
+            raise CommandError(f'Query plan checks are not supported on {connection.vendor}')
+
+        failures = []
+        # Everything runs in a transaction that is rolled back, so the check
+        # is safe against any database
+        with transaction.atomic(using=options['database']):
+            if connection.vendor == 'postgresql':
+                # Small tables make sequential scans look cheap; disabling them
+                # means a Seq Scan in the plan really is a missing index
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            user = self.create_fixture_user()
+            client = Client()
+            client.force_login(user)
+
+            # Async views must query on this connection to see the fixture
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'], ASYNC_QUERY_THREADS=0):
+                for name, params in CHECKED_ENDPOINTS:
+                    url = reverse(name)
+                    bump_data_version(user.pk)
+                    with CaptureQueriesContext(connection) as captured:
+                        response = client.get(url, params, secure=not settings.DEBUG)
+                    if response.status_code != 200:
+                        failures.append(f'{name}: HTTP {response.status_code}')
+                        continue
+
+                    for query in captured.captured_queries:
+                        sql = query['sql']
+                        if not any(table in sql for table in GUARDED_TABLES) or not sql.lstrip().upper().startswith('SELECT'):
+                            continue
+                        plan = self.explain(connection, explain_prefix + sql)
+                        if options['verbose_plans']:
+                            self.stdout.write(f'{name}: {sql}\n{plan}\n')
+                        scanned = [table for table in full_scan.findall(plan) if table in GUARDED_TABLES]
+                        if scanned:
+                            failures.append(f"{name}: full scan of {', '.join(scanned)}\n  {sql}\n  {plan}")
+
+            transaction.set_rollback(True, using=options['database'])
+
+        if failures:
+            raise CommandError('Query plan regressions:\n' + '\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS(f'{len(CHECKED_ENDPOINTS)} endpoints use indexed plans'))
+
+    def create_fixture_user(self):
+        user = User.objects.create_user(
+            username='query-plan-check@example.com',
+            email='query-plan-check@example.com',
+        )
+        today = timezone.now().date()
+        Budget.objects.create(user=user, category='food', limit_amount=100)
+        Transaction.objects.create(user=user, type='expense', category='food', amount=10, date=today)
+        Transaction.objects.create(user=user, type='income', category='salary', amount=50, date=today)
+        return user
+
+    def explain(self, connection, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
@@ -0,0 +1,40 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy a SQLite primary database into the SQLite replicas in REPLICA_DATABASE_URLS, '
+        'standing in for replication when trying replica routing locally'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Keep copying every this many seconds (simulates replication lag)',
+        )
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only a SQLite primary can be copied; real replicas are kept up to date by the database')
+        if not settings.REPLICA_DATABASES:
+            raise CommandError('No replicas configured; set REPLICA_DATABASE_URLS')
+        replicas = [connections[alias] for alias in settings.REPLICA_DATABASES]
+        for replica in replicas:
+            if replica.vendor != 'sqlite':
+                raise CommandError(f'{replica.alias} is not a SQLite database')
+
+        while True:
+            primary.ensure_connection()
+            for replica in replicas:
+                replica.ensure_connection()
+                # SQLite online backup: a consistent snapshot, schema included
+                primary.connection.backup(replica.connection)
+                self.stdout.write(f"Copied {primary.settings_dict['NAME']} to {replica.settings_dict['NAME']}")
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import PendingWrite, Tombstone
+from api.sync import tombstone_horizon
+
+# Pending writes older than this were left behind by a crashed process
+STALE_PENDING_WRITE = timedelta(days=1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete deletion tombstones older than SYNC_TOMBSTONE_RETENTION_DAYS '
+        'and pending write records left behind by crashed processes'
+    )
+
+    def handle(self, *args, **options):
+        # Clients whose sync token predates the horizon get a full snapshot,
+        # so these tombstones are never read again
+        horizon = tombstone_horizon()
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=horizon).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} tombstones older than {horizon:%Y-%m-%d %H:%M}'))
+
+        stale, _ = PendingWrite.objects.filter(started_at__lt=timezone.now() - STALE_PENDING_WRITE).delete()
+        if stale:
+            self.stdout.write(f'Deleted {stale} stale pending write records')
@@ -0,0 +1,25 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.rollups import rebuild_monthly_totals
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the MonthlyCategoryTotal rollup table from transactions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only rebuild rows for the user with this email',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(email=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}")
+
+        written = rebuild_monthly_totals(user=user)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} monthly total rows'))
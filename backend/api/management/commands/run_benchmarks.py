@@ -0,0 +1,143 @@
+import json
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.cache import bump_data_version
+from api.urls import router
+
+# Query parameters needed by list actions that reject bare requests
+ACTION_PARAMS = {
+    'transaction-by-category': {'category': 'food'},
+    'transaction-by-date-range': {
+        'start_date': (date.today() - timedelta(days=90)).isoformat(),
+        'end_date': date.today().isoformat(),
+    },
+}
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(samples) - 1, round(fraction * len(samples) + 0.5) - 1))
+    return samples[index]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark every GET endpoint of the api router and report latency and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', default='bench-user-0@example.com', help='Email of the user to benchmark as')
+        parser.add_argument('--iterations', type=int, default=20, help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint')
+        parser.add_argument('--cold', action='store_true', help='Invalidate the response cache before every request')
+        parser.add_argument('--only', help='Comma-separated URL names to run (e.g. dashboard-overview)')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be at least 1')
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}; run seed_benchmark_data first")
+
+        token = RefreshToken.for_user(user).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        only = set(options['only'].split(',')) if options['only'] else None
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for name, url in self.endpoints(user):
+                if only and name not in only:
+                    continue
+                results[name] = self.measure(client, user, url, options)
+                self.stderr.write(
+                    f"{name:40} p50={results[name]['p50_ms']:8.2f}ms "
+                    f"queries={results[name]['queries']}"
+                )
+
+        report = {
+            'generated_at': timezone.now().isoformat(),
+            'user': user.email,
+            'iterations': options['iterations'],
+            'cold_cache': options['cold'],
+            'endpoints': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+    def endpoints(self, user):
+        """Yield (url name, url) for every GET route registered on the api router"""
+        detail_ids = {
+            'transaction': user.transactions.values_list('pk', flat=True).first(),
+            'budget': user.budgets.values_list('pk', flat=True).first(),
+        }
+        seen = set()
+        for pattern in router.urls:
+            actions = getattr(pattern.callback, 'actions', None)
+            name = pattern.name
+            if not actions or 'get' not in actions or name in seen:
+                continue
+            seen.add(name)
+
+            kwargs = {}
+            if 'pk' in pattern.pattern.regex.groupindex:
+                pk = detail_ids.get(name.rsplit('-', 1)[0])
+                if pk is None:
+                    continue
+                kwargs['pk'] = pk
+
+            url = reverse(name, kwargs=kwargs)
+            params = ACTION_PARAMS.get(name)
+            if params:
+                url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+            yield name, url
+
+    def measure(self, client, user, url, options):
+        for _ in range(options['warmup']):
+            self.request(client, url)
+
+        timings = []
+        queries = []
+        status = None
+        for _ in range(options['iterations']):
+            if options['cold']:
+                bump_data_version(user.pk)
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured.captured_queries))
+            status = response.status_code
+
+        timings.sort()
+        return {
+            'url': url,
+            'status': status,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(queries),
+        }
+
+    def request(self, client, url):
+        response = client.get(url, secure=not settings.DEBUG)
+        if response.streaming:
+            # Drain streamed bodies so the full export cost is measured
+            for _ in response.streaming_content:
+                pass
+        return response
@@ -0,0 +1,94 @@
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from api.jobs import claim_next, purge_finished, requeue_stale, run_job
+
+# How often idle workers look for stale jobs and purge old results
+HOUSEKEEPING_INTERVAL = 300
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (reports and other slow work)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=settings.JOB_WORKER_CONCURRENCY,
+            help='Jobs to run at the same time (one thread each, plus a heartbeat thread per running job)',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.JOB_POLL_INTERVAL,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        self.stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        self.housekeeping()
+        self.stdout.write(f"Worker started with {options['concurrency']} threads")
+        with ThreadPoolExecutor(max_workers=options['concurrency'], thread_name_prefix='job') as pool:
+            for _ in range(options['concurrency']):
+                pool.submit(self.work, options)
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
+
+    def stop(self, signum, frame):
+        # Let running jobs finish; no new ones are claimed
+        self.stopping.set()
+
+    def work(self, options):
+        last_housekeeping = time.monotonic()
+        try:
+            while not self.stopping.is_set():
+                close_old_connections()
+                self.lift_statement_timeout()
+                job = claim_next()
+                if job is None:
+                    if options['once']:
+                        return
+                    if time.monotonic() - last_housekeeping > HOUSEKEEPING_INTERVAL:
+                        self.housekeeping()
+                        last_housekeeping = time.monotonic()
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                job = run_job(job)
+                self.stdout.write(
+                    f'{job.kind} #{job.pk} {job.status} in {time.perf_counter() - started:.2f}s'
+                )
+        except Exception as exc:
+            self.stderr.write(f'Worker thread crashed: {exc!r}')
+            self.stopping.set()
+            raise
+        finally:
+            connection.close()
+
+    def lift_statement_timeout(self):
+        """Web requests are capped by DB_STATEMENT_TIMEOUT_MS; jobs use JOB_STATEMENT_TIMEOUT_MS"""
+        if connection.vendor != 'postgresql':
+            return
+        connection.ensure_connection()
+        # Once per physical connection; the wrapper is per thread
+        if getattr(connection, '_job_timeout_connection', None) is connection.connection:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('SET statement_timeout = %s', [settings.JOB_STATEMENT_TIMEOUT_MS])
+        connection._job_timeout_connection = connection.connection
+
+    def housekeeping(self):
+        requeued = requeue_stale()
+        purged = purge_finished()
+        if requeued or purged:
+            self.stdout.write(f'Recovered {requeued} stale jobs, purged {purged} finished jobs')
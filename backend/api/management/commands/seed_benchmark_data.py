@@ -0,0 +1,102 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.models import Budget, Transaction
+from api.signals import transactions_bulk_changed
+
+BENCHMARK_EMAIL = 'bench-user-{index}@example.com'
+
+# Relative frequency and typical amount for each category
+EXPENSE_PROFILE = {
+    'food': (30, Decimal('25')),
+    'transport': (20, Decimal('12')),
+    'entertainment': (10, Decimal('30')),
+    'utilities': (5, Decimal('80')),
+    'education': (3, Decimal('150')),
+    'health': (4, Decimal('60')),
+    'shopping': (12, Decimal('45')),
+    'other': (6, Decimal('20')),
+}
+INCOME_PROFILE = {
+    'salary': (30, Decimal('2500')),
+    'freelance': (15, Decimal('400')),
+    'scholarship': (3, Decimal('1000')),
+    'part-time job': (20, Decimal('300')),
+    'internship': (5, Decimal('800')),
+    'bonus': (3, Decimal('500')),
+    'investment': (8, Decimal('120')),
+    'gift': (6, Decimal('50')),
+    'allowance': (10, Decimal('100')),
+}
+
+
+class Command(BaseCommand):
+    help = 'Seed synthetic users, transactions and budgets for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=5, help='Number of users to create')
+        parser.add_argument('--transactions', type=int, default=1000, help='Transactions per user')
+        parser.add_argument('--budgets', type=int, default=6, help='Budgets per user (at most 8)')
+        parser.add_argument('--months', type=int, default=24, help='How many months of history to spread transactions over')
+        parser.add_argument('--income-ratio', type=float, default=0.15, help='Share of transactions that are income')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+        parser.add_argument('--password', default='benchmark-pass', help='Password for the seeded users')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded users first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            deleted, _ = User.objects.filter(email__startswith='bench-user-', email__endswith='@example.com').delete()
+            self.stdout.write(f'Deleted {deleted} previously seeded rows')
+
+        expense_categories = [value for value, label in Transaction.EXPENSE_CATEGORIES]
+        today = date.today()
+        days = max(1, options['months'] * 30)
+
+        for index in range(options['users']):
+            email = BENCHMARK_EMAIL.format(index=index)
+            user, created = User.objects.get_or_create(username=email, defaults={'email': email})
+            if created:
+                user.set_password(options['password'])
+                user.save(update_fields=['password'])
+
+            with transaction.atomic():
+                for category in rng.sample(expense_categories, min(options['budgets'], len(expense_categories))):
+                    _, typical = EXPENSE_PROFILE[category]
+                    Budget.objects.update_or_create(
+                        user=user,
+                        category=category,
+                        defaults={'limit_amount': typical * rng.randint(4, 12)},
+                    )
+
+                rows = []
+                for _ in range(options['transactions']):
+                    is_income = rng.random() < options['income_ratio']
+                    profile = INCOME_PROFILE if is_income else EXPENSE_PROFILE
+                    category = rng.choices(list(profile), weights=[weight for weight, _ in profile.values()])[0]
+                    typical = profile[category][1]
+                    amount = (typical * Decimal(str(rng.lognormvariate(0, 0.5)))).quantize(Decimal('0.01'))
+                    rows.append(Transaction(
+                        user=user,
+                        type='income' if is_income else 'expense',
+                        category=category,
+                        amount=amount,
+                        description=f'Synthetic {category} #{rng.randint(1, 99999)}',
+                        date=today - timedelta(days=rng.randrange(days)),
+                    ))
+                Transaction.objects.bulk_create(rows, batch_size=1000)
+                transactions_bulk_changed.send(
+                    sender=Transaction, user=user, dates={row.date for row in rows}
+                )
+
+            self.stdout.write(f'Seeded {email}: {len(rows)} transactions')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {options['users']} users (password: {options['password']})"
+        ))
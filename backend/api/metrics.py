@@ -0,0 +1,159 @@
+"""
+In-process request metrics rendered in the Prometheus text format.
+
+``api.middleware.RequestMetricsMiddleware`` records one observation per
+request and ``api.cache`` counts response cache hits and misses;
+``MetricsView`` exposes the registry to staff users. Metrics are
+held per worker process, so scrape each worker (or aggregate downstream)
+when running several gunicorn workers.
+"""
+import threading
+from bisect import bisect_left
+
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket', {**labels, 'le': _format_number(bound)}, cumulative
+        yield f'{name}_bucket', {**labels, 'le': '+Inf'}, self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-route request metrics"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.cache_lookups = {'hits': 0, 'misses': 0}
+
+    def observe(self, route, method, status, seconds, queries, sql_seconds, size=None):
+        with self.lock:
+            metrics = self.routes.get((route, method))
+            if metrics is None:
+                metrics = self.routes[(route, method)] = RouteMetrics()
+            metrics.latency.observe(seconds)
+            metrics.queries.observe(queries)
+            metrics.sql_seconds += sql_seconds
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def count_cache_lookup(self, result):
+        """Count a response cache lookup; ``result`` is 'hits' or 'misses'"""
+        with self.lock:
+            self.cache_lookups[result] += 1
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.cache_lookups = {'hits': 0, 'misses': 0}
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format"""
+        families = {
+            'api_requests_total': ('counter', 'Requests by route, method and status', []),
+            'api_request_duration_seconds': ('histogram', 'Request latency', []),
+            'api_request_queries': ('histogram', 'SQL queries per request', []),
+            'api_request_sql_seconds_total': ('counter', 'Time spent in SQL', []),
+            'api_response_size_bytes': ('histogram', 'Response body size', []),
+            'api_response_cache_total': ('counter', 'Response cache lookups by result', []),
+        }
+
+        with self.lock:
+            for (route, method), metrics in sorted(self.routes.items()):
+                labels = {'route': route, 'method': method}
+                for status, count in sorted(metrics.statuses.items()):
+                    families['api_requests_total'][2].append(
+                        ('api_requests_total', {**labels, 'status': str(status)}, count)
+                    )
+                families['api_request_duration_seconds'][2].extend(
+                    metrics.latency.samples('api_request_duration_seconds', labels)
+                )
+                families['api_request_queries'][2].extend(
+                    metrics.queries.samples('api_request_queries', labels)
+                )
+                families['api_request_sql_seconds_total'][2].append(
+                    ('api_request_sql_seconds_total', labels, metrics.sql_seconds)
+                )
+                if metrics.response_size.count:
+                    families['api_response_size_bytes'][2].extend(
+                        metrics.response_size.samples('api_response_size_bytes', labels)
+                    )
+            for result, count in self.cache_lookups.items():
+                families['api_response_cache_total'][2].append(
+                    ('api_response_cache_total', {'result': result}, count)
+                )
+
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for sample_name, labels, value in samples:
+                lines.append(f'{sample_name}{_format_labels(labels)} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for key, value in labels.items()
+    )
+    return '{' + pairs + '}'
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+
+class MetricsView(APIView):
+    """Expose request metrics for Prometheus (staff only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
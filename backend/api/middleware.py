@@ -0,0 +1,183 @@
+import re
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+
+from .metrics import registry
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# API payloads worth compressing; HTML (which carries CSRF tokens) is left alone
+COMPRESSIBLE_TYPES = ('application/json', 'text/csv')
+
+re_accepts_br = re.compile(r'\bbr\b(?!\s*;\s*q=0(?:\.0*)?(?![\d.]))')
+
+
+# Counter of the request being measured; copied into threads started with
+# sync_to_async, such as the one running sync views under ASGI and the async
+# views' query pool
+current_query_counter = ContextVar('current_query_counter', default=None)
+
+
+class QueryCounter:
+    """Counts queries and time spent in SQL for one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Query pool threads add to the same counter concurrently
+        self.lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.count += 1
+                self.seconds += elapsed
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection (see ``api.signals``):
+    counts the query towards the request being measured, if any, whichever
+    thread runs it.
+    """
+    counter = current_query_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter(execute, sql, params, many, context)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record latency, SQL query count/time and response size per route.
+
+    Sync and async capable, so under ASGI async views stay on the event loop;
+    every other middleware in MIDDLEWARE must be too (see RENDER_DEPLOYMENT.md
+    on WhiteNoise).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        token = current_query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_counter.reset(token)
+        self.observe(request, response, time.perf_counter() - start, counter)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        counter = QueryCounter()
+        token = current_query_counter.set(counter)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_counter.reset(token)
+        self.observe(request, response, time.perf_counter() - start, counter)
+        return response
+
+    def observe(self, request, response, seconds, counter):
+        registry.observe(
+            route=self.route_name(request),
+            method=request.method,
+            status=response.status_code,
+            seconds=seconds,
+            queries=counter.count,
+            sql_seconds=counter.seconds,
+            size=None if response.streaming else len(response.content),
+        )
+
+    def route_name(self, request):
+        # Use the URL name (e.g. "dashboard-overview") rather than the path so
+        # ids and unknown URLs do not create a label per request
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress JSON and CSV responses of at least COMPRESSION_MIN_SIZE bytes.
+
+    Uses brotli when the client accepts it and the package is installed,
+    otherwise Django's gzip (with its BREACH length randomization).
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        if brotli is None or not re_accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.abrotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = self.brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=settings.COMPRESSION_BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong ETag becomes weak (as GZipMiddleware does)
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    def brotli_sequence(self, chunks):
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
+
+    async def abrotli_sequence(self, chunks):
+        compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        async for chunk in chunks:
+            data = compressor.process(chunk)
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def populate_monthly_totals(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    MonthlyCategoryTotal = apps.get_model('api', 'MonthlyCategoryTotal')
+
+    totals = {}
+    grouped = (
+        Transaction.objects
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'type', 'category')
+        .annotate(total=Sum('amount'), count=Count('id'))
+        .order_by()
+    )
+    for row in grouped:
+        key = (row['user_id'], row['month'], row['type'], row['category'] or '')
+        total, count = totals.get(key, (0, 0))
+        totals[key] = (total + row['total'], count + row['count'])
+
+    MonthlyCategoryTotal.objects.bulk_create(
+        [
+            MonthlyCategoryTotal(
+                user_id=user_id, month=month, type=type, category=category,
+                total=total, count=count,
+            )
+            for (user_id, month, type, category), (total, count) in totals.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_transaction_category'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCategoryTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('type', models.CharField(choices=[('expense', 'Expense'), ('income', 'Income')], max_length=10)),
+                ('category', models.CharField(blank=True, default='', help_text='Empty for uncategorized transactions', max_length=50)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-month', 'type', 'category'],
+                'unique_together': {('user', 'month', 'type', 'category')},
+            },
+        ),
+        migrations.RunPython(populate_monthly_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+import logging
+
+from django.db import migrations
+from django.db.models.functions import Lower
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_duplicate_emails(apps, schema_editor):
+    """
+    Keep each case-insensitive email on its oldest account only.
+
+    Later accounts (by date_joined, then id) with the same email have it
+    blanked, so the unique index can be built. Each one is logged with its
+    former email: the account keeps its username and data, and can be given
+    a new email in the admin.
+    """
+    User = apps.get_model('auth', 'User')
+
+    owners = {}
+    duplicates = []
+    users = (
+        User.objects.exclude(email='')
+        .annotate(email_ci=Lower('email'))
+        .order_by('date_joined', 'id')
+        .values_list('id', 'email', 'email_ci')
+    )
+    for user_id, email, email_ci in users.iterator():
+        if email_ci in owners:
+            duplicates.append(user_id)
+            logger.warning(
+                'Cleared email %r of user %s: user %s (the oldest account) keeps it',
+                email, user_id, owners[email_ci],
+            )
+        else:
+            owners[email_ci] = user_id
+
+    if duplicates:
+        User.objects.filter(id__in=duplicates).update(email='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_transaction_aggregate_indexes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(resolve_duplicate_emails, migrations.RunPython.noop),
+        # The unique index only covers non-blank emails, so a plain lookup
+        # must repeat its WHERE clause to use it; the second, non-partial
+        # index serves LOWER(email) = ... lookups on every backend.
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX auth_user_email_ci_uniq ON auth_user (LOWER(email)) WHERE email <> ''",
+            reverse_sql='DROP INDEX auth_user_email_ci_uniq',
+        ),
+        migrations.RunSQL(
+            sql='CREATE INDEX auth_user_email_ci_idx ON auth_user (LOWER(email))',
+            reverse_sql='DROP INDEX auth_user_email_ci_idx',
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('food', 'Food & Groceries'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('utilities', 'Utilities'), ('education', 'Education'), ('health', 'Health & Medical'), ('shopping', 'Shopping'), ('other', 'Other')], max_length=50)),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('threshold', models.PositiveSmallIntegerField(help_text='Percent of the budget limit')),
+                ('spent', models.DecimalField(decimal_places=2, help_text='Spending when the threshold was crossed', max_digits=14)),
+                ('limit_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_alerts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('read_at__isnull', True)), fields=['user', '-created_at'], name='alert_user_unread_idx')],
+                'unique_together': {('user', 'category', 'month', 'threshold')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_budgetalert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTransaction',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('type', models.CharField(choices=[('expense', 'Expense'), ('income', 'Income')], max_length=10)),
+                ('category', models.CharField(blank=True, choices=[('food', 'Food & Groceries'), ('transport', 'Transport'), ('entertainment', 'Entertainment'), ('utilities', 'Utilities'), ('education', 'Education'), ('health', 'Health & Medical'), ('shopping', 'Shopping'), ('other', 'Other'), ('salary', 'Salary'), ('freelance', 'Freelance'), ('scholarship', 'Scholarship'), ('part-time job', 'Part-time Job'), ('internship', 'Internship'), ('bonus', 'Bonus'), ('investment', 'Investment'), ('gift', 'Gift'), ('allowance', 'Allowance')], max_length=50, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date', '-created_at'],
+                'indexes': [models.Index(fields=['user', '-date'], name='archived_txn_user_date_idx')],
+            },
+        ),
+    ]
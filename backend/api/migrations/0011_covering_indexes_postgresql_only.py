@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """
+    Drop ``include`` from the model's aggregate indexes so SQLite raises no
+    models.W040. The database keeps the indexes built by 0004: covering
+    (INCLUDE amount) on PostgreSQL, key columns only on SQLite.
+    """
+
+    dependencies = [
+        ('api', '0010_pendingwrite'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveIndex(
+                    model_name='transaction',
+                    name='txn_user_type_cat_date_idx',
+                ),
+                migrations.RemoveIndex(
+                    model_name='transaction',
+                    name='txn_user_type_date_idx',
+                ),
+                migrations.AddIndex(
+                    model_name='transaction',
+                    index=models.Index(fields=['user', 'type', 'category', 'date'], name='txn_user_type_cat_date_idx'),
+                ),
+                migrations.AddIndex(
+                    model_name='transaction',
+                    index=models.Index(fields=['user', 'type', 'date'], name='txn_user_type_date_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_covering_indexes_postgresql_only'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Refreshed by the worker while the job runs', null=True),
+        ),
+    ]
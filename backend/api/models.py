@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 
@@ -30,6 +30,10 @@ class Budget(models.Model):
     class Meta:
         unique_together = ('user', 'category')
         ordering = ['-updated_at']
+        indexes = [
+            # Delta sync: rows changed since a client's last sync
+            models.Index(fields=['user', 'updated_at'], name='budget_user_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.category}: ${self.limit_amount}"
@@ -90,8 +94,174 @@ class Transaction(models.Model):
         ordering = ['-date', '-created_at']
         indexes = [
             models.Index(fields=['user', '-date']),
-            models.Index(fields=['user', 'type']),
+            # Per-category and per-type aggregates over a date range. Built
+            # by migration 0004 with INCLUDE (amount), which only PostgreSQL
+            # applies; the model leaves it out (see migration 0011)
+            models.Index(fields=['user', 'type', 'category', 'date'], name='txn_user_type_cat_date_idx'),
+            models.Index(fields=['user', 'type', 'date'], name='txn_user_type_date_idx'),
+            # Delta sync: rows changed since a client's last sync
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
         ]
 
     def __str__(self):
         return f"{self.user.username} - {self.type}: ${self.amount} on {self.date}"
+
+    def save(self, *args, **kwargs):
+        # The rollup is updated by pre_save/post_save receivers (api.signals);
+        # one transaction keeps it in step with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ArchivedTransaction(models.Model):
+    """
+    A Transaction moved out of the hot table by ``manage.py archive_transactions``.
+
+    Same id and fields as the original; its amount stays in the
+    MonthlyCategoryTotal rollup.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_transactions')
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    category = models.CharField(max_length=50, choices=Transaction.ALL_CATEGORIES, null=True, blank=True)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    description = models.CharField(max_length=255, blank=True)
+    date = models.DateField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-date', '-created_at']
+        indexes = [
+            models.Index(fields=['user', '-date'], name='archived_txn_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.type}: ${self.amount} on {self.date} (archived)"
+
+
+class MonthlyCategoryTotal(models.Model):
+    """Per-user monthly totals by type and category, kept in sync with Transaction writes"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_totals')
+    month = models.DateField(help_text='First day of the month')
+    type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    category = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        help_text='Empty for uncategorized transactions'
+    )
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'month', 'type', 'category')
+        ordering = ['-month', 'type', 'category']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.month:%Y-%m} {self.type}/{self.category}: ${self.total}"
+
+
+class Tombstone(models.Model):
+    """Record of a deleted Transaction or Budget, kept so clients can sync deletions"""
+    MODEL_CHOICES = [
+        ('transaction', 'Transaction'),
+        ('budget', 'Budget'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tombstones')
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+            # Purging expired tombstones across all users
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.model} #{self.object_id} deleted {self.deleted_at}"
+
+
+class PendingWrite(models.Model):
+    """
+    A multi-row write transaction in progress for a user (import, batch, admin
+    bulk action). Delta sync holds its tokens back to the oldest one's start
+    until it finishes; see ``api.sync.pending_write``.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    started_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'started_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - write started {self.started_at}"
+
+
+class Job(models.Model):
+    """A unit of background work, queued in the database and run by ``manage.py run_jobs``"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    kind = models.CharField(max_length=50, help_text='Name of the registered job handler')
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, help_text='Refreshed by the worker while the job runs'
+    )
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Workers claim the oldest queued job
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class BudgetAlert(models.Model):
+    """A budget threshold (percent of the limit) crossed by a month's spending in a category"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='budget_alerts')
+    category = models.CharField(max_length=50, choices=Budget.CATEGORY_CHOICES)
+    month = models.DateField(help_text='First day of the month')
+    threshold = models.PositiveSmallIntegerField(help_text='Percent of the budget limit')
+    spent = models.DecimalField(max_digits=14, decimal_places=2, help_text='Spending when the threshold was crossed')
+    limit_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'category', 'month', 'threshold')
+        ordering = ['-created_at']
+        indexes = [
+            # The unread feed clients poll
+            models.Index(
+                fields=['user', '-created_at'],
+                condition=models.Q(read_at__isnull=True),
+                name='alert_user_unread_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.category} {self.month:%Y-%m} reached {self.threshold}%"
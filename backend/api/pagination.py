@@ -0,0 +1,128 @@
+import base64
+from datetime import date, datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class TransactionPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Clients opt in with ``?pagination=cursor`` and follow the returned
+    ``next`` link. Cursor pages are ordered on (-date, -created_at, id) and
+    seek directly to the last row seen, so there is no COUNT(*) and no
+    OFFSET scan no matter how deep the client pages.
+
+    The queryset may also be a tuple of querysets listed as one (hot and
+    archived transactions). Page-number mode pages over their UNION; cursor
+    mode seeks in each and merges the results.
+    """
+    mode_query_param = 'pagination'
+    cursor_query_param = 'cursor'
+    cursor_page_size_query_param = 'page_size'
+    max_cursor_page_size = 100
+    ordering = ('-date', '-created_at', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_cursor_mode(self, request):
+        """Return True when the client asked for keyset pagination"""
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request)
+        parts = queryset if isinstance(queryset, tuple) else (queryset,)
+        if not self.cursor_mode:
+            if len(parts) > 1:
+                first, *rest = (part.order_by() for part in parts)
+                queryset = first.union(*rest, all=True).order_by(*self.ordering)
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_cursor_page_size(request)
+        encoded = request.query_params.get(self.cursor_query_param)
+        position = self.decode_cursor(encoded) if encoded else None
+
+        rows = []
+        for part in parts:
+            part = part.order_by(*self.ordering)
+            if position is not None:
+                part = part.filter(self.after_position(position))
+            rows.extend(part[:page_size + 1])
+        if len(parts) > 1:
+            rows.sort(key=self.sort_key)
+            rows = rows[:page_size + 1]
+
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        url = replace_query_param(url, self.mode_query_param, 'cursor')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_cursor_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.cursor_page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_cursor_page_size)
+
+    def after_position(self, position):
+        """Q object selecting rows strictly after ``position`` in keyset order"""
+        row_date, created_at, pk = position
+        return (
+            Q(date__lt=row_date)
+            | Q(date=row_date, created_at__lt=created_at)
+            | Q(date=row_date, created_at=created_at, id__gt=pk)
+        )
+
+    def position(self, row):
+        """(date, created_at, id) of a row or values() dict"""
+        if isinstance(row, dict):
+            return row['date'], row['created_at'], row['id']
+        return row.date, row.created_at, row.pk
+
+    def sort_key(self, row):
+        """Python sort key matching ``ordering``"""
+        row_date, created_at, pk = self.position(row)
+        return -row_date.toordinal(), -created_at.timestamp(), pk
+
+    def encode_cursor(self, row):
+        row_date, created_at, pk = self.position(row)
+        position = f'{row_date.isoformat()}|{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, encoded):
+        try:
+            position = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            row_date, created_at, pk = position.split('|')
+            return (
+                date.fromisoformat(row_date),
+                datetime.fromisoformat(created_at),
+                int(pk),
+            )
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
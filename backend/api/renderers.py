@@ -0,0 +1,94 @@
+"""
+orjson-based JSON renderer and parser.
+
+Drop-in replacements for DRF's JSONRenderer / JSONParser (see
+``REST_FRAMEWORK`` in settings). Output is byte-for-byte what DRF produces
+for compact, unicode JSON: datetimes, dates, Decimals and other types orjson
+would format differently are passed through to DRF's own ``JSONEncoder``.
+Pretty-printed output (``; indent=`` or the browsable API), non-default
+``UNICODE_JSON`` / ``COMPACT_JSON`` settings and anything orjson cannot handle
+use the stdlib path. orjson writes NaN and Infinity as ``null``; data holding
+them is also rendered by the stdlib, which rejects them under ``STRICT_JSON``
+exactly as DRF does.
+"""
+import codecs
+import math
+from io import BytesIO
+
+import orjson
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+# Let DRF's encoder format these exactly as the stdlib renderer would
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def _has_non_finite_float(data):
+    """True if NaN or Infinity appears anywhere in nested dicts and lists"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers over 64 bits; let the stdlib render or reject it
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # NaN/Infinity become null, so only output containing null can hide one
+        if b'null' in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same JavaScript-safe escaping as JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser that decodes with orjson.
+
+    Integers beyond 64 bits decode as floats; no API field accepts them.
+    """
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            utf8 = codecs.lookup(encoding).name == 'utf-8'
+        except LookupError:
+            utf8 = False
+        if not utf8:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Re-parse with the stdlib for its semantics and error messages
+            # (orjson rejects e.g. NaN, which non-strict JSON allows)
+            return super().parse(BytesIO(body), media_type, parser_context)
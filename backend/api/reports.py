@@ -0,0 +1,115 @@
+"""
+Yearly and multi-year financial reports, generated as background jobs.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .jobs import job_handler
+from .models import ArchivedTransaction, MonthlyCategoryTotal, Transaction
+
+LARGEST_EXPENSES = 5
+
+
+def parse_report_years(data):
+    """
+    Validate ``start_year`` / ``end_year`` request data.
+
+    Both default to the current year. Returns ``(params, error)``.
+    """
+    current = timezone.now().year
+    try:
+        end_year = int(data.get('end_year') or current)
+        start_year = int(data.get('start_year') or end_year)
+    except (TypeError, ValueError):
+        return None, 'start_year and end_year must be integers'
+
+    if not 1900 <= start_year <= end_year <= current:
+        return None, f'Years must satisfy 1900 <= start_year <= end_year <= {current}'
+    if end_year - start_year + 1 > settings.REPORT_MAX_YEARS:
+        return None, f'A report can cover at most {settings.REPORT_MAX_YEARS} years'
+    return {'start_year': start_year, 'end_year': end_year}, None
+
+
+def _empty_year(year):
+    return {
+        'year': year,
+        'income': Decimal('0.00'),
+        'expenses': Decimal('0.00'),
+        'transaction_count': 0,
+        'months': [
+            {'month': f'{year}-{month:02d}', 'income': Decimal('0.00'), 'expenses': Decimal('0.00')}
+            for month in range(1, 13)
+        ],
+        'categories': {'expense': {}, 'income': {}},
+    }
+
+
+def _as_strings(value):
+    """Render Decimals as strings, recursively, so the result is JSON-serializable"""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return {key: _as_strings(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_as_strings(item) for item in value]
+    return value
+
+
+@job_handler('yearly_report', read_only=True)
+def yearly_report(user, start_year, end_year):
+    """Income, spending, categories and largest expenses for each year in the range"""
+    years = {year: _empty_year(year) for year in range(start_year, end_year + 1)}
+
+    # Monthly figures come from the rollup: one row per month/type/category
+    rollup = MonthlyCategoryTotal.objects.filter(
+        user=user,
+        month__gte=date(start_year, 1, 1),
+        month__lte=date(end_year, 12, 1),
+    ).values_list('month', 'type', 'category', 'total', 'count')
+    for month, type, category, total, count in rollup:
+        report = years[month.year]
+        key = 'expenses' if type == 'expense' else 'income'
+        report[key] += total
+        report['transaction_count'] += count
+        report['months'][month.month - 1][key] += total
+        categories = report['categories'][type]
+        name = category or 'uncategorized'
+        categories[name] = categories.get(name, Decimal('0.00')) + total
+
+    for year, report in years.items():
+        report['net'] = report['income'] - report['expenses']
+        report['savings_rate'] = (
+            float(report['net'] / report['income'] * 100) if report['income'] > 0 else None
+        )
+        # Old years may have been moved to the archive table
+        candidates = []
+        for model in (Transaction, ArchivedTransaction):
+            candidates.extend(
+                model.objects.filter(
+                    user=user,
+                    type='expense',
+                    date__gte=date(year, 1, 1),
+                    date__lte=date(year, 12, 31),
+                ).order_by('-amount', '-date').values(
+                    'id', 'category', 'amount', 'description', 'date'
+                )[:LARGEST_EXPENSES]
+            )
+        candidates.sort(key=lambda expense: (expense['amount'], expense['date']), reverse=True)
+        report['largest_expenses'] = candidates[:LARGEST_EXPENSES]
+        for expense in report['largest_expenses']:
+            expense['date'] = expense['date'].isoformat()
+
+    income = sum((report['income'] for report in years.values()), Decimal('0.00'))
+    expenses = sum((report['expenses'] for report in years.values()), Decimal('0.00'))
+    return _as_strings({
+        'start_year': start_year,
+        'end_year': end_year,
+        'generated_at': timezone.now().isoformat(),
+        'income': income,
+        'expenses': expenses,
+        'net': income - expenses,
+        'years': list(years.values()),
+    })
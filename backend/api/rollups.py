@@ -0,0 +1,170 @@
+"""
+Maintenance of the MonthlyCategoryTotal rollup table.
+
+Dashboard and budget endpoints read monthly totals from the rollup instead of
+rescanning Transaction rows. The rollup is updated incrementally from the
+Transaction signals in ``api.signals``; ``rebuild_monthly_totals`` and
+``find_rollup_mismatches`` back the management commands used to repair and
+verify it. Archived transactions (``manage.py archive_transactions``) keep
+their share of the rollup, so both recompute from Transaction and
+ArchivedTransaction together.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import ArchivedTransaction, MonthlyCategoryTotal, Transaction
+
+
+def month_start(value):
+    """Return the first day of the month containing ``value``"""
+    value = Transaction._meta.get_field('date').to_python(value)
+    return value.replace(day=1)
+
+
+def apply_delta(user_id, month, type, category, amount, count):
+    """Add ``amount`` and ``count`` to a single rollup row, creating or removing it as needed"""
+    lookup = {
+        'user_id': user_id,
+        'month': month,
+        'type': type,
+        'category': category or '',
+    }
+    rows = MonthlyCategoryTotal.objects.filter(**lookup)
+
+    with transaction.atomic():
+        updated = rows.update(total=F('total') + amount, count=F('count') + count)
+        if not updated and count > 0:
+            try:
+                with transaction.atomic():
+                    MonthlyCategoryTotal.objects.create(total=amount, count=count, **lookup)
+            except IntegrityError:
+                # Another writer created the row first; fold our delta into it
+                rows.update(total=F('total') + amount, count=F('count') + count)
+        if count < 0:
+            rows.filter(count__lte=0).delete()
+
+
+def apply_transaction(values, sign):
+    """Add (sign=1) or remove (sign=-1) a transaction's contribution to the rollup"""
+    amount = Transaction._meta.get_field('amount').to_python(values['amount'])
+    apply_delta(
+        values['user_id'],
+        month_start(values['date']),
+        values['type'],
+        values['category'],
+        amount * sign,
+        sign,
+    )
+
+
+def _next_month(month):
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _transactions(user=None, months=None):
+    """Querysets over every transaction that feeds the rollup: hot and archived"""
+    sources = []
+    for model in (Transaction, ArchivedTransaction):
+        transactions = model.objects.all()
+        if user is not None:
+            transactions = transactions.filter(user=user)
+        if months is not None:
+            in_months = Q(pk__in=[])
+            for month in months:
+                in_months |= Q(date__gte=month, date__lt=_next_month(month))
+            transactions = transactions.filter(in_months)
+        sources.append(transactions)
+    return sources
+
+
+def _rollups(user=None, months=None):
+    rollups = MonthlyCategoryTotal.objects.all()
+    if user is not None:
+        rollups = rollups.filter(user=user)
+    if months is not None:
+        rollups = rollups.filter(month__in=months)
+    return rollups
+
+
+def _expected_totals(sources):
+    """Aggregate the ``sources`` querysets into {(user_id, month, type, category): (total, count)}"""
+    expected = {}
+    for transactions in sources:
+        grouped = (
+            transactions
+            .annotate(month=TruncMonth('date'))
+            .values('user_id', 'month', 'type', 'category')
+            .annotate(total=Sum('amount'), count=Count('id'))
+            .order_by()
+        )
+        for row in grouped:
+            # NULL and blank categories share the same rollup row
+            key = (row['user_id'], row['month'], row['type'], row['category'] or '')
+            total, count = expected.get(key, (Decimal('0.00'), 0))
+            expected[key] = (total + (row['total'] or Decimal('0.00')), count + row['count'])
+    return expected
+
+
+def rebuild_monthly_totals(user=None, months=None):
+    """
+    Recompute rollup rows from Transaction and ArchivedTransaction.
+
+    Limited to ``user`` and/or an iterable of dates (each standing for its
+    month) when given, otherwise the whole table is rebuilt. Returns the
+    number of rows written.
+    """
+    if months is not None:
+        months = {month_start(month) for month in months}
+
+    with transaction.atomic():
+        _rollups(user, months).delete()
+        rows = [
+            MonthlyCategoryTotal(
+                user_id=user_id,
+                month=month,
+                type=type,
+                category=category,
+                total=total,
+                count=count,
+            )
+            for (user_id, month, type, category), (total, count)
+            in _expected_totals(_transactions(user, months)).items()
+        ]
+        MonthlyCategoryTotal.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def find_rollup_mismatches(user=None):
+    """
+    Compare the rollup against a fresh aggregate of all transactions, archived included.
+
+    Returns a list of dicts describing every key whose stored total or count
+    differs from the expected value (missing rows count as zero).
+    """
+    expected = _expected_totals(_transactions(user))
+    actual = {
+        (row.user_id, row.month, row.type, row.category): (row.total, row.count)
+        for row in _rollups(user)
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual), key=str):
+        want = expected.get(key, (Decimal('0.00'), 0))
+        have = actual.get(key, (Decimal('0.00'), 0))
+        if want != have:
+            user_id, month, type, category = key
+            mismatches.append({
+                'user_id': user_id,
+                'month': month,
+                'type': type,
+                'category': category,
+                'expected_total': want[0],
+                'expected_count': want[1],
+                'actual_total': have[0],
+                'actual_count': have[1],
+            })
+    return mismatches
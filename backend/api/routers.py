@@ -0,0 +1,85 @@
+"""
+Read-replica routing.
+
+Every database alias listed in REPLICA_DATABASES (built from
+REPLICA_DATABASE_URLS in settings) holds a copy of the primary. Queries go to
+the primary (``default``) unless they run inside ``replica_reads(user)``; the
+read-only analytics endpoints (dashboard, spending vs budget, exports) and
+report jobs do, so their reads are served by a replica picked at random.
+Writes always go to the primary and migrations only run there.
+
+Replicas lag behind the primary, so a user who wrote within the last
+REPLICA_READ_YOUR_WRITES_SECONDS keeps reading from the primary, as does
+any code running inside a transaction on the primary. A user's last
+write time is their cache data version (see ``api.cache``), which every
+committed Transaction or Budget change bumps; the cache must therefore be
+shared by all processes (system check ``api.E002``).
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import seconds_since_write
+
+# Alias reads are routed to in the current context; None means the primary
+_read_database = ContextVar('read_database', default=None)
+
+
+def replica_for(user):
+    """The replica alias ``user``'s reads may use right now, or None for the primary"""
+    if not settings.REPLICA_DATABASES or user is None or not user.is_authenticated:
+        return None
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        # Reads inside a transaction must see its uncommitted writes (this
+        # also keeps TestCase, which wraps every test in one, on the primary)
+        return None
+    if seconds_since_write(user.pk) < settings.REPLICA_READ_YOUR_WRITES_SECONDS:
+        return None
+    return random.choice(settings.REPLICA_DATABASES)
+
+
+@contextmanager
+def using_database(alias):
+    """Route reads in this context to ``alias`` (None for the primary); yields the alias used"""
+    token = _read_database.set(alias)
+    try:
+        yield alias or DEFAULT_DB_ALIAS
+    finally:
+        _read_database.reset(token)
+
+
+def replica_reads(user):
+    """Route reads in this context to a replica, unless ``user`` wrote recently"""
+    return using_database(replica_for(user))
+
+
+def read_from_replica(view):
+    """Run a viewset action's queries on a read replica (see ``replica_reads``)"""
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        with replica_reads(request.user):
+            return view(self, request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Send reads to the alias chosen by ``using_database``, everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        return _read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db == DEFAULT_DB_ALIAS
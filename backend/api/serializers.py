@@ -1,7 +1,21 @@
-from rest_framework import serializers
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Value
+from django.db.models.functions import Lower
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Transaction, Budget
+from .models import BudgetAlert, Job, Transaction, Budget
+
+
+def users_with_email(email):
+    """Users whose email matches case-insensitively, via the LOWER(email) index"""
+    return User.objects.alias(email_ci=Lower('email')).filter(email_ci=Lower(Value(email)))
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -24,18 +38,23 @@ class RegisterSerializer(serializers.Serializer):
         return data
 
     def validate_email(self, value):
-        if User.objects.filter(email=value).exists():
+        if users_with_email(value).exists():
             raise serializers.ValidationError("Email already registered.")
         return value
 
     def create(self, validated_data):
-        user = User.objects.create_user(
-            username=validated_data['email'],
-            email=validated_data['email'],
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', ''),
-        )
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(
+                    username=validated_data['email'],
+                    email=validated_data['email'],
+                    password=validated_data['password'],
+                    first_name=validated_data.get('first_name', ''),
+                    last_name=validated_data.get('last_name', ''),
+                )
+        except IntegrityError:
+            # A concurrent registration won the unique email/username index
+            raise serializers.ValidationError({"email": ["Email already registered."]})
         return user
 
 
@@ -48,7 +67,7 @@ class LoginSerializer(serializers.Serializer):
         password = data.get('password')
 
         try:
-            user = User.objects.get(email=email)
+            user = users_with_email(email).get()
         except User.DoesNotExist:
             raise serializers.ValidationError("Invalid email or password.")
 
@@ -66,7 +85,44 @@ class AuthResponseSerializer(serializers.Serializer):
     user = UserSerializer()
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+def parse_sparse_fields(params, available):
+    """
+    Resolve ``?fields=a,b`` / ``?exclude=a,b`` against the ``available`` field names.
+
+    Returns ``(fields, error)``; ``fields`` is None when neither is given,
+    otherwise the selected names in ``available`` order.
+    """
+    include = params.get('fields')
+    exclude = params.get('exclude')
+    if include is None and exclude is None:
+        return None, None
+    if include is not None and exclude is not None:
+        return None, 'Use either fields or exclude, not both'
+
+    names = {name.strip() for name in (include or exclude).split(',') if name.strip()}
+    unknown = names.difference(available)
+    if unknown:
+        return None, f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(available)}"
+    if include is not None:
+        selected = [name for name in available if name in names]
+    else:
+        selected = [name for name in available if name not in names]
+    if not selected:
+        return None, 'At least one field must be selected'
+    return selected, None
+
+
+class SparseFieldsMixin:
+    """ModelSerializer mixin that drops every field not in the ``fields`` argument"""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields).difference(fields):
+                self.fields.pop(name)
+
+
+class TransactionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ['id', 'user', 'type', 'category', 'amount', 'description', 'date', 'created_at', 'updated_at']
@@ -79,13 +135,133 @@ class TransactionSerializer(serializers.ModelSerializer):
         return data
 
 
-class BudgetSerializer(serializers.ModelSerializer):
+# Columns read by the fast list path, in TransactionSerializer field order
+TRANSACTION_VALUE_FIELDS = (
+    'id', 'user_id', 'type', 'category', 'amount', 'description', 'date', 'created_at', 'updated_at',
+)
+TRANSACTION_FIELD_COLUMNS = dict(zip(TransactionSerializer.Meta.fields, TRANSACTION_VALUE_FIELDS))
+
+
+CENTS = Decimal('0.01')
+
+
+def _format_amount(value):
+    return '{:f}'.format(value.quantize(CENTS))
+
+
+def _timestamp_formatter():
+    """ISO 8601 formatter matching serializers.DateTimeField in the current timezone"""
+    tz = timezone.get_current_timezone() if settings.USE_TZ else None
+
+    def format_timestamp(value):
+        if tz is not None and timezone.is_aware(value):
+            value = value.astimezone(tz)
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+
+    return format_timestamp
+
+
+def _transaction_representations():
+    """Formatters for amount, date and timestamps, identical to the serializer's fields"""
+    fields = TransactionSerializer().fields
+    if (
+        api_settings.COERCE_DECIMAL_TO_STRING
+        and not fields['amount'].localize
+        and api_settings.DATE_FORMAT == ISO_8601
+        and api_settings.DATETIME_FORMAT == ISO_8601
+    ):
+        return _format_amount, date.isoformat, _timestamp_formatter()
+    # Non-default output formats: defer to the serializer fields themselves
+    return (
+        fields['amount'].to_representation,
+        fields['date'].to_representation,
+        fields['created_at'].to_representation,
+    )
+
+
+def transaction_rows(queryset, fields=None, extra=()):
+    """
+    Narrow a Transaction queryset to the columns used by serialize_transaction_rows.
+
+    ``fields`` limits them to a sparse fieldset; ``extra`` names further
+    columns the caller needs (e.g. keyset pagination positions).
+    """
+    if fields is None:
+        return queryset.values(*TRANSACTION_VALUE_FIELDS)
+    columns = [TRANSACTION_FIELD_COLUMNS[name] for name in fields]
+    return queryset.values(*columns, *(column for column in extra if column not in columns))
+
+
+def serialize_transaction_rows(rows, fields=None):
+    """
+    Read-only fast path producing the same output as TransactionSerializer.
+
+    Builds response dicts directly from ``transaction_rows()`` values instead
+    of running the serializer field machinery per row. Amounts, dates and
+    timestamps are formatted exactly as the serializer's fields format them.
+    With ``fields`` only those keys are produced.
+    """
+    amount, date, timestamp = _transaction_representations()
+    if fields is not None:
+        formatters = {'amount': amount, 'date': date, 'created_at': timestamp, 'updated_at': timestamp}
+        plan = [
+            (name, TRANSACTION_FIELD_COLUMNS[name], formatters.get(name))
+            for name in fields
+        ]
+        return [
+            {
+                name: row[column] if formatter is None else formatter(row[column])
+                for name, column, formatter in plan
+            }
+            for row in rows
+        ]
+    return [
+        {
+            'id': row['id'],
+            'user': row['user_id'],
+            'type': row['type'],
+            'category': row['category'],
+            'amount': amount(row['amount']),
+            'description': row['description'],
+            'date': date(row['date']),
+            'created_at': timestamp(row['created_at']),
+            'updated_at': timestamp(row['updated_at']),
+        }
+        for row in rows
+    ]
+
+
+class BudgetSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Budget
         fields = ['id', 'user', 'category', 'limit_amount', 'created_at', 'updated_at']
         read_only_fields = ['id', 'user', 'created_at', 'updated_at']
 
 
+class BudgetAlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BudgetAlert
+        fields = ['id', 'category', 'month', 'threshold', 'spent', 'limit_amount', 'created_at', 'read_at']
+        read_only_fields = fields
+
+
+class JobSerializer(serializers.ModelSerializer):
+    error = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'params', 'status', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+    def get_error(self, obj):
+        """Only the exception line of the stored traceback"""
+        lines = [line for line in obj.error.splitlines() if line.strip()]
+        return lines[-1] if lines else None
+
+
 class DashboardOverviewSerializer(serializers.Serializer):
     """Dashboard overview with spending summary"""
     total_expenses = serializers.DecimalField(max_digits=10, decimal_places=2)
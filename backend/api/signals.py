@@ -0,0 +1,193 @@
+"""
+Model signal handlers for the api app.
+
+Handlers for Transaction and Budget writes:
+
+- keep the MonthlyCategoryTotal rollup in step with every Transaction
+  create, update and delete
+- record a Tombstone for every deleted Transaction and Budget (delta sync)
+- re-evaluate budget alerts once the rollup has changed
+- bump the owner's cache data version after commit
+
+Saving or deleting a User drops it from the authentication cache, and every
+new database connection gets the request metrics' query counter.
+
+Code that writes in bulk bypasses model signals, and sends
+``transactions_bulk_changed`` (with the affected dates) or
+``budgets_bulk_changed`` instead. Bulk deletes go through the ORM inside
+``suppress_model_signals``, which the Transaction and Budget handlers check.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from . import rollups
+from .alerts import evaluate_budget_alerts
+from .authentication import invalidate_cached_user
+from .cache import bump_data_version
+from .middleware import count_queries
+from .models import Budget, Tombstone, Transaction
+
+# Sent with ``user`` and ``dates`` after transactions are written in bulk
+transactions_bulk_changed = Signal()
+# Sent with ``user`` after budgets are written in bulk
+budgets_bulk_changed = Signal()
+
+ROLLUP_FIELDS = ('user_id', 'type', 'category', 'amount', 'date')
+
+_suppressed = ContextVar('model_signals_suppressed', default=False)
+
+
+@contextmanager
+def suppress_model_signals():
+    """
+    Skip the Transaction and Budget handlers below while the block runs.
+
+    For writes that keep the rollup, tombstones, alerts and caches in step
+    themselves, e.g. by sending a bulk signal afterwards.
+    """
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+
+def _rollup_values(instance):
+    return {field: getattr(instance, field) for field in ROLLUP_FIELDS}
+
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, raw=False, **kwargs):
+    """Capture the stored row before an update so its old month/category can be reversed"""
+    instance._rollup_previous = None
+    if raw or instance.pk is None or _suppressed.get():
+        return
+    # Transaction.save runs in a transaction: locking the row makes a
+    # concurrent edit wait, then reverse the values this one stores
+    instance._rollup_previous = (
+        Transaction.objects.select_for_update().filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollup_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or _suppressed.get():
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = _rollup_values(instance)
+    if previous == current:
+        return
+    with transaction.atomic():
+        if previous is not None:
+            rollups.apply_transaction(previous, -1)
+        rollups.apply_transaction(current, 1)
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollup_on_delete(sender, instance, origin=None, **kwargs):
+    # Rollup rows are removed by the same cascade when a user is deleted
+    if isinstance(origin, User) or _suppressed.get():
+        return
+    rollups.apply_transaction(_rollup_values(instance), -1)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Budget)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # A deleted user has nothing left to sync
+    if isinstance(origin, User) or _suppressed.get():
+        return
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+@receiver(transactions_bulk_changed)
+def rebuild_rollup_after_bulk_change(sender, user, dates, **kwargs):
+    rollups.rebuild_monthly_totals(user=user, months=dates)
+
+
+def _expense_categories(*values):
+    return {row['category'] for row in values if row is not None and row['type'] == 'expense'}
+
+
+# Registered after the rollup receivers above, so they read updated totals
+@receiver(post_save, sender=Transaction)
+def evaluate_alerts_on_transaction_save(sender, instance, raw=False, **kwargs):
+    if raw or _suppressed.get():
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = _rollup_values(instance)
+    if previous == current:
+        return
+    evaluate_budget_alerts(instance.user_id, _expense_categories(previous, current))
+
+
+@receiver(post_delete, sender=Transaction)
+def evaluate_alerts_on_transaction_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, User) or _suppressed.get():
+        return
+    evaluate_budget_alerts(instance.user_id, _expense_categories(_rollup_values(instance)))
+
+
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def evaluate_alerts_on_budget_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or isinstance(origin, User) or _suppressed.get():
+        return
+    # All budgets: an update may have moved the budget to another category
+    evaluate_budget_alerts(instance.user_id)
+
+
+@receiver(transactions_bulk_changed)
+@receiver(budgets_bulk_changed)
+def evaluate_alerts_after_bulk_change(sender, user, **kwargs):
+    evaluate_budget_alerts(user.pk)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Budget)
+@receiver(post_delete, sender=Budget)
+def invalidate_cached_responses(sender, instance, raw=False, **kwargs):
+    if raw or _suppressed.get():
+        return
+    # Bump after commit so a concurrent read cannot cache pre-commit data
+    # under the new version
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+@receiver(transactions_bulk_changed)
+@receiver(budgets_bulk_changed)
+def invalidate_cached_responses_after_bulk_change(sender, user, **kwargs):
+    user_id = user.pk
+    transaction.on_commit(lambda: bump_data_version(user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user_on_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Drop now, and again after commit in case a concurrent request cached
+    # the row as it was before this write
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    # Request metrics count queries on every connection, including those of
+    # threads serving a request; the wrapper list outlives reconnects
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
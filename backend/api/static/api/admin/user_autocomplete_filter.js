@@ -0,0 +1,11 @@
+'use strict';
+// Reload the changelist filtered to the user picked in UserAutocompleteFilter
+window.addEventListener('load', function() {
+    django.jQuery('.user-autocomplete-filter').on('change', function() {
+        if (!this.value) {
+            return;
+        }
+        const query = this.dataset.queryString;
+        window.location.search = query + (query.length > 1 ? '&' : '') + 'user=' + encodeURIComponent(this.value);
+    });
+});
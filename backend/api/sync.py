@@ -0,0 +1,108 @@
+"""
+Delta sync of a user's transactions and budgets.
+
+Clients keep the opaque ``next`` token from their last sync and send it back
+as ``since``; the response then holds only rows whose ``updated_at`` is newer
+plus the ids of rows deleted since (from Tombstone). Clients apply changes as
+idempotent upserts, so returning a row twice is harmless; missing one is not.
+
+Rows are stamped before their transaction commits, so the token must not pass
+a write that is still open:
+
+- Single-row writes commit right after stamping; the token handed out lies
+  ``SYNC_SAFETY_MARGIN_SECONDS`` in the past to cover them.
+- Multi-row writes (import, batch, admin bulk actions) may run for much
+  longer. They run inside ``pending_write``, which records their start in a
+  PendingWrite row, committed before the write begins and deleted after it
+  ends. The token never passes the start of a user's oldest pending write.
+
+Tombstones are kept for ``SYNC_TOMBSTONE_RETENTION_DAYS`` (see the
+``purge_tombstones`` command); an older token gets a full snapshot instead.
+"""
+import base64
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Budget, PendingWrite, Tombstone, Transaction
+from .serializers import BudgetSerializer, serialize_transaction_rows, transaction_rows
+
+
+class InvalidSyncToken(Exception):
+    """Raised when a client sends a sync token this server did not issue"""
+
+
+def encode_sync_token(value):
+    return base64.urlsafe_b64encode(value.isoformat().encode()).decode()
+
+
+def decode_sync_token(token):
+    try:
+        value = datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode())
+    except (ValueError, UnicodeError):
+        raise InvalidSyncToken('Invalid sync token')
+    if timezone.is_naive(value):
+        raise InvalidSyncToken('Invalid sync token')
+    return value
+
+
+@contextmanager
+def pending_write(*user_ids):
+    """
+    Hold back sync tokens of ``user_ids`` while the block runs.
+
+    Must be entered outside any transaction, so other requests see the
+    PendingWrite rows while the block's own transaction is open. Rows left
+    behind by a crashed process only make clients receive some rows again;
+    ``purge_tombstones`` removes them.
+    """
+    started = [PendingWrite.objects.create(user_id=user_id).pk for user_id in set(user_ids)]
+    try:
+        yield
+    finally:
+        PendingWrite.objects.filter(pk__in=started).delete()
+
+
+def tombstone_horizon(now=None):
+    """Tombstones older than this are purged, so tokens older than it need a full sync"""
+    return (now or timezone.now()) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+def sync_changes(user, since=None, now=None):
+    """
+    Return the user's changes since ``since`` (a datetime from a sync token).
+
+    Without ``since``, or when it is older than the tombstone retention, the
+    result is a full snapshot with ``full`` set and no deletions; clients
+    replace their local copy with it.
+    """
+    now = now or timezone.now()
+    full = since is None or since < tombstone_horizon(now)
+
+    # Read before the rows: a write that is no longer pending has committed
+    next_since = now - timedelta(seconds=settings.SYNC_SAFETY_MARGIN_SECONDS)
+    oldest_pending = PendingWrite.objects.filter(user=user).aggregate(started=Min('started_at'))['started']
+    if oldest_pending is not None:
+        # Strictly earlier, for rows stamped in the write's first microsecond
+        next_since = min(next_since, oldest_pending - timedelta(microseconds=1))
+
+    transactions = Transaction.objects.filter(user=user)
+    budgets = Budget.objects.filter(user=user)
+    deleted = {model: [] for model, label in Tombstone.MODEL_CHOICES}
+    if not full:
+        transactions = transactions.filter(updated_at__gt=since)
+        budgets = budgets.filter(updated_at__gt=since)
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=since)
+        for model, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[model].append(object_id)
+
+    return {
+        'full': full,
+        'transactions': serialize_transaction_rows(transaction_rows(transactions)),
+        'budgets': BudgetSerializer(budgets, many=True).data,
+        'deleted': deleted,
+        'next': encode_sync_token(next_since),
+    }
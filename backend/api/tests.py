@@ -0,0 +1,889 @@
+import csv
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, IntegrityError, connection, connections
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .archive import archive_batch, archive_cutoff
+from .authentication import AUTH_USER_KEY, invalidate_cached_user
+from .cache import DATA_VERSION_KEY
+from .exporters import EXPORT_FIELDS
+from .jobs import JOB_HANDLERS, claim_next, enqueue, job_handler, requeue_stale, run_job
+from .metrics import registry
+from .middleware import RequestMetricsMiddleware
+from .models import ArchivedTransaction, Budget, BudgetAlert, Job, MonthlyCategoryTotal, Tombstone, Transaction
+from .rollups import rebuild_monthly_totals
+from .routers import replica_reads
+from .sync import decode_sync_token, pending_write, sync_changes
+from .signals import budgets_bulk_changed, transactions_bulk_changed
+from .serializers import BudgetSerializer, TransactionSerializer, serialize_transaction_rows, transaction_rows
+from .urls import async_dashboard_urlpatterns
+from .views import DashboardViewSet
+
+# URLconf of AsyncDashboardTests: the API as served with ASYNC_DASHBOARD=True
+urlpatterns = [
+    path('api/', include(async_dashboard_urlpatterns)),
+    path('api/', include('api.urls')),
+]
+
+
+class DashboardOverviewQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_user(self, budgets, transactions):
+        """A user with ``budgets`` budgets and ``transactions`` transactions, rollup included"""
+        user = User.objects.create_user(f'owner{budgets}@example.com', f'owner{budgets}@example.com', 'password123')
+        for category, _ in Budget.CATEGORY_CHOICES[:budgets]:
+            Budget.objects.create(user=user, category=category, limit_amount=Decimal('100.00'))
+
+        today = date.today()
+        categories = [category for category, _ in Budget.CATEGORY_CHOICES] + ['salary']
+        Transaction.objects.bulk_create([
+            Transaction(
+                user=user,
+                type='income' if categories[i % 9] == 'salary' else 'expense',
+                category=categories[i % 9],
+                amount=Decimal('12.50') + i,
+                date=today - timedelta(days=i % 90),
+            )
+            for i in range(transactions)
+        ])
+        # bulk_create sends no signals, so build the rollup the overview reads
+        rebuild_monthly_totals(user)
+        return user
+
+    def get_overview(self, user):
+        # Skip the response cache so every request computes the overview
+        cache.clear()
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/dashboard/overview/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def assert_overview_matches(self, user, overview):
+        transactions = Transaction.objects.filter(user=user)
+        this_month = transactions.filter(type='expense', date__gte=date.today().replace(day=1))
+
+        def total(queryset):
+            return queryset.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+
+        expenses = total(transactions.filter(type='expense'))
+        income = total(transactions.filter(type='income'))
+        self.assertEqual(Decimal(overview['total_expenses']), expenses)
+        self.assertEqual(Decimal(overview['total_income']), income)
+        self.assertEqual(Decimal(overview['net_balance']), income - expenses)
+        self.assertEqual(Decimal(overview['this_month_spending']), total(this_month))
+
+        budgets = Budget.objects.filter(user=user)
+        self.assertEqual(
+            {item['category']: Decimal(item['spent']) for item in overview['budget_progress']},
+            {budget.category: total(this_month.filter(category=budget.category)) for budget in budgets},
+        )
+
+    def test_query_count_does_not_grow_with_budgets_or_transactions(self):
+        small_user = self.create_user(budgets=1, transactions=10)
+        with CaptureQueriesContext(connection) as small:
+            overview = self.get_overview(small_user)
+        self.assert_overview_matches(small_user, overview)
+
+        large_user = self.create_user(budgets=8, transactions=500)
+        with self.assertNumQueries(len(small.captured_queries)):
+            overview = self.get_overview(large_user)
+        self.assert_overview_matches(large_user, overview)
+        self.assertEqual(len(overview['budget_progress']), 8)
+        self.assertNotEqual(Decimal(overview['total_expenses']), Decimal('0.00'))
+
+
+class RollupMaintenanceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.transaction = Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('10.00'), date=date(2024, 3, 15),
+        )
+
+    def assert_rollup_matches_rebuild(self):
+        def rows():
+            return sorted(
+                MonthlyCategoryTotal.objects.filter(user=self.user)
+                .values_list('month', 'type', 'category', 'total', 'count')
+            )
+
+        maintained = rows()
+        rebuild_monthly_totals(self.user)
+        self.assertEqual(maintained, rows())
+
+    def test_insert(self):
+        Transaction.objects.create(
+            user=self.user, type='income', category='salary', amount=Decimal('99.99'), date=date(2024, 3, 1),
+        )
+        self.assert_rollup_matches_rebuild()
+
+    def test_amount_edit(self):
+        self.transaction.amount = Decimal('25.50')
+        self.transaction.save()
+        self.assert_rollup_matches_rebuild()
+
+    def test_move_across_month_and_category(self):
+        self.transaction.date = date(2024, 4, 1)
+        self.transaction.save()
+        self.assert_rollup_matches_rebuild()
+        self.transaction.category = 'transport'
+        self.transaction.save()
+        self.assert_rollup_matches_rebuild()
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user=self.user, month=date(2024, 3, 1)).exists())
+
+    def test_delete(self):
+        self.transaction.delete()
+        self.assert_rollup_matches_rebuild()
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user=self.user).exists())
+
+    def test_failed_rollup_update_rolls_back_the_row(self):
+        self.transaction.amount = Decimal('25.50')
+        with mock.patch('api.rollups.apply_delta', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.transaction.save()
+        self.transaction.refresh_from_db()
+        self.assertEqual(self.transaction.amount, Decimal('10.00'))
+        self.assert_rollup_matches_rebuild()
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        today = date.today()
+        for i in range(25):
+            Transaction.objects.create(
+                user=self.user, type='expense', category='food', amount=Decimal(i), date=today - timedelta(days=i % 3),
+            )
+        # Tie created_at as well, so only the id tells rows apart
+        Transaction.objects.update(created_at=timezone.now())
+
+    def test_pages_with_tied_dates_have_no_gaps_or_duplicates(self):
+        ids = []
+        url = '/api/transactions/?pagination=cursor&page_size=4'
+        while url:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 4)
+            ids += [row['id'] for row in page['results']]
+            url = page['next']
+
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(set(ids), set(Transaction.objects.values_list('id', flat=True)))
+        expected = list(Transaction.objects.order_by('-date', '-created_at', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+
+class TransactionImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, **data):
+        file = SimpleUploadedFile('bank.csv', content.encode(), content_type='text/csv')
+        return self.client.post('/api/transactions/import/', {'file': file, **data}, format='multipart')
+
+    def test_invalid_rows_are_reported_and_roll_back_the_import(self):
+        response = self.upload(
+            'date,amount,category,description\n'
+            '2024-03-01,-12.50,food,Lunch\n'
+            'not a date,-3.00,food,Bad date\n'
+            '2024-03-02,1500,salary,Pay\n'
+            '2024-03-03,abc,transport,Bad amount\n'
+        )
+        self.assertEqual(response.status_code, 400)
+        report = response.json()
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['error_count'], 2)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 5])
+        self.assertIn('date', report['errors'][0]['errors'])
+        self.assertIn('amount', report['errors'][1]['errors'])
+        self.assertFalse(Transaction.objects.filter(user=self.user).exists())
+        self.assertFalse(MonthlyCategoryTotal.objects.filter(user=self.user).exists())
+
+    def test_skip_invalid_keeps_the_valid_rows(self):
+        response = self.upload(
+            'date,amount,category\n2024-03-01,-12.50,food\nnot a date,-3.00,food\n',
+            skip_invalid='true',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual(Transaction.objects.get(user=self.user).amount, Decimal('12.50'))
+        self.assertEqual(MonthlyCategoryTotal.objects.get(user=self.user).total, Decimal('12.50'))
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        today = date.today()
+        for i, (type, category) in enumerate((('expense', 'food'), ('income', 'salary'), ('expense', 'other'))):
+            Transaction.objects.create(
+                user=self.user, type=type, category=category, amount=Decimal('10.05') * (i + 1),
+                date=today - timedelta(days=i), description=f'row, "{i}"',
+            )
+
+    def listed_rows(self):
+        return self.client.get('/api/transactions/?page_size=100').json()['results']
+
+    def exported_rows(self, file_format):
+        response = self.client.get(f'/api/transactions/export/?file_format={file_format}')
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def assert_rows_match(self, exported):
+        listed = self.listed_rows()
+        self.assertEqual(len(exported), len(listed))
+        for exported_row, listed_row in zip(exported, listed):
+            for field in EXPORT_FIELDS:
+                self.assertEqual(str(exported_row[field]), str(listed_row[field]), field)
+
+    def test_csv_rows_match_list(self):
+        self.assert_rows_match(list(csv.DictReader(StringIO(self.exported_rows('csv')))))
+
+    def test_ndjson_rows_match_list(self):
+        self.assert_rows_match([json.loads(line) for line in self.exported_rows('ndjson').splitlines()])
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('10.00'), date=date.today(),
+        )
+        self.budget = Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+
+    def test_one_invalid_operation_leaves_nothing_written(self):
+        today = date.today().isoformat()
+        response = self.client.post('/api/batch/', {'operations': [
+            {'op': 'create', 'model': 'transaction', 'data': {
+                'type': 'expense', 'category': 'transport', 'amount': '3.00', 'date': today,
+            }},
+            {'op': 'update', 'model': 'transaction', 'id': self.transaction.pk, 'data': {
+                'type': 'expense', 'category': 'food', 'amount': '99.00', 'date': today,
+            }},
+            {'op': 'delete', 'model': 'budget', 'id': self.budget.pk},
+            {'op': 'create', 'model': 'transaction', 'data': {
+                'type': 'expense', 'category': 'food', 'amount': 'abc', 'date': today,
+            }},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['operations']], [3])
+        self.assertEqual(list(Transaction.objects.values_list('pk', 'amount')), [(self.transaction.pk, Decimal('10.00'))])
+        self.assertTrue(Budget.objects.filter(pk=self.budget.pk).exists())
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(
+            list(MonthlyCategoryTotal.objects.values_list('category', 'total')), [('food', Decimal('10.00'))],
+        )
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.transaction = Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('10.00'), date=date.today(),
+        )
+        self.budget = Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        data = response.json()
+        return data['results'][0] if 'results' in data else data[0] if isinstance(data, list) else data
+
+    def test_fields_and_exclude_on_list_and_detail(self):
+        for base, pk, serializer in (
+            ('/api/transactions/', self.transaction.pk, TransactionSerializer),
+            ('/api/budgets/', self.budget.pk, BudgetSerializer),
+        ):
+            all_fields = serializer.Meta.fields
+            for url in (base, f'{base}{pk}/'):
+                with self.subTest(url=url):
+                    self.assertEqual(list(self.get(f'{url}?fields=id,created_at')), ['id', 'created_at'])
+                    self.assertEqual(
+                        list(self.get(f'{url}?exclude=user,updated_at')),
+                        [name for name in all_fields if name not in ('user', 'updated_at')],
+                    )
+                    self.assertEqual(list(self.get(url)), all_fields)
+
+    def test_invalid_fieldsets_are_rejected(self):
+        for query in ('fields=id&exclude=user', 'fields=nope', 'exclude=' + ','.join(TransactionSerializer.Meta.fields)):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(f'/api/transactions/?{query}').status_code, 400)
+
+
+@override_settings(BUDGET_ALERT_THRESHOLDS=[50, 80, 100])
+class BudgetAlertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+
+    def spend(self, amount):
+        return Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal(amount), date=date.today(),
+        )
+
+    def test_crossing_a_threshold_records_one_alert(self):
+        self.spend('40.00')
+        self.assertFalse(BudgetAlert.objects.exists())
+
+        crossing = self.spend('15.00')
+        alert = BudgetAlert.objects.get()
+        self.assertEqual((alert.category, alert.threshold, alert.spent), ('food', 50, Decimal('55.00')))
+
+        crossing.description = 'groceries'
+        crossing.save()
+        self.spend('1.00')
+        self.assertEqual(BudgetAlert.objects.count(), 1)
+
+        response = self.client.get('/api/alerts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['threshold'] for item in response.json()['results']], [50])
+
+
+@override_settings(BUDGET_ALERT_THRESHOLDS=[50, 80, 100])
+class AdminBulkDeleteTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        admin_user = User.objects.create_superuser('admin@example.com', 'admin@example.com', 'password123')
+        self.client.force_login(admin_user)
+        self.budget = Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+        self.transactions = [
+            Transaction.objects.create(
+                user=self.user, type='expense', category=category, amount=Decimal(amount), date=date.today(),
+            )
+            for category, amount in (('food', '60.00'), ('food', '30.00'), ('transport', '10.00'))
+        ]
+
+    def delete_selected(self, model_name, objects):
+        response = self.client.post(f'/admin/api/{model_name}/', {
+            'action': 'delete_selected',
+            '_selected_action': [obj.pk for obj in objects],
+            'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def tombstoned(self, model_name):
+        return set(Tombstone.objects.filter(model=model_name).values_list('object_id', flat=True))
+
+    def test_transaction_delete_keeps_rollup_tombstones_and_alerts_in_step(self):
+        self.assertEqual(set(BudgetAlert.objects.values_list('threshold', flat=True)), {50, 80})
+        deleted = self.transactions[:2]
+        self.delete_selected('transaction', deleted)
+
+        self.assertEqual(list(Transaction.objects.all()), self.transactions[2:])
+        self.assertEqual(
+            sorted(Tombstone.objects.filter(model='transaction').values_list('object_id', flat=True)),
+            sorted(obj.pk for obj in deleted),
+        )
+        self.assertFalse(BudgetAlert.objects.exists())
+
+        def rows():
+            return sorted(MonthlyCategoryTotal.objects.values_list('month', 'type', 'category', 'total', 'count'))
+
+        maintained = rows()
+        rebuild_monthly_totals(self.user)
+        self.assertEqual(maintained, rows())
+        self.assertEqual([row[2] for row in maintained], ['transport'])
+
+    def test_budget_delete_records_tombstones_and_withdraws_alerts(self):
+        self.delete_selected('budget', [self.budget])
+        self.assertFalse(Budget.objects.exists())
+        self.assertEqual(self.tombstoned('budget'), {self.budget.pk})
+        self.assertFalse(BudgetAlert.objects.exists())
+
+
+@override_settings(BUDGET_ALERT_THRESHOLDS=[50, 80, 100])
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+        today = date.today()
+        self.old = [
+            Transaction.objects.create(
+                user=self.user, type='expense', category='food',
+                amount=Decimal('5.00') + i, date=today - timedelta(days=400 + i),
+            )
+            for i in range(5)
+        ]
+        self.recent = Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('60.00'), date=today,
+        )
+        self.cutoff = archive_cutoff(days=365)
+
+    def rollup(self):
+        return sorted(MonthlyCategoryTotal.objects.values_list('month', 'type', 'category', 'total', 'count'))
+
+    def listed_ids(self, query=''):
+        response = self.client.get(f'/api/transactions/?page_size=100{query}')
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.json()['results']}
+
+    def trend(self, bucket, window):
+        # Archiving bumps the data version on commit, which TestCase never reaches
+        cache.clear()
+        response = self.client.get(f'/api/dashboard/spending_trend/?bucket={bucket}&window={window}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batches_move_rows_without_touching_rollup_tombstones_or_alerts(self):
+        rollup = self.rollup()
+        alerts = list(BudgetAlert.objects.values_list('pk', 'threshold'))
+        self.assertEqual([threshold for _, threshold in alerts], [50])
+        old_ids = sorted(obj.pk for obj in self.old)
+
+        first = archive_batch(self.cutoff, batch_size=3)
+        self.assertEqual(first, old_ids[:3])
+        self.assertEqual(archive_batch(self.cutoff, batch_size=3, after_id=first[-1]), old_ids[3:])
+        self.assertEqual(archive_batch(self.cutoff, batch_size=3, after_id=old_ids[-1]), [])
+
+        self.assertEqual(list(Transaction.objects.values_list('pk', flat=True)), [self.recent.pk])
+        self.assertEqual(sorted(ArchivedTransaction.objects.values_list('pk', flat=True)), old_ids)
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertEqual(list(BudgetAlert.objects.values_list('pk', 'threshold')), alerts)
+        self.assertEqual(self.rollup(), rollup)
+        rebuild_monthly_totals(self.user)
+        self.assertEqual(self.rollup(), rollup)
+
+    def test_already_archived_id_aborts_the_batch(self):
+        ArchivedTransaction.objects.create(
+            id=self.old[0].pk, user=self.user, type='expense', category='food',
+            amount=Decimal('1.00'), date=self.old[0].date, created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        with self.assertRaises(IntegrityError):
+            archive_batch(self.cutoff, batch_size=10)
+        self.assertEqual(Transaction.objects.count(), 6)
+
+    def test_listings_include_archived_rows_on_request(self):
+        call_command('archive_transactions', older_than_days=365, batch_size=2, stdout=StringIO())
+        self.assertEqual(self.listed_ids(), {self.recent.pk})
+        self.assertEqual(
+            self.listed_ids('&include_archived=true'),
+            {self.recent.pk} | {obj.pk for obj in self.old},
+        )
+
+    def test_trend_totals_include_archived_rows(self):
+        # Day buckets read both tables, month buckets the rollup
+        windows = {'day': 731, 'month': 24}
+        before = {bucket: self.trend(bucket, window) for bucket, window in windows.items()}
+        call_command('archive_transactions', older_than_days=365, stdout=StringIO())
+        self.assertEqual(ArchivedTransaction.objects.count(), 5)
+        for bucket, window in windows.items():
+            with self.subTest(bucket=bucket):
+                self.assertEqual(self.trend(bucket, window), before[bucket])
+        expected = sum(obj.amount for obj in self.old) + self.recent.amount
+        for bucket, trend in before.items():
+            self.assertEqual(sum(Decimal(point['amount']) for point in trend), expected)
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_READ_YOUR_WRITES_SECONDS=5)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+        Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('10.00'), date=date.today(),
+        )
+
+    def age_last_write(self, seconds):
+        """Pretend the user's last write happened ``seconds`` ago"""
+        cache.set(DATA_VERSION_KEY.format(user_id=self.user.pk), time.time_ns() - seconds * 10**9, timeout=None)
+
+    def read(self, url):
+        """GET ``url``; return the queries sent to the primary and to the replica"""
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = self.client.get(url)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+        return len(primary.captured_queries), len(replica.captured_queries)
+
+    def test_analytics_reads_go_to_the_replica(self):
+        self.age_last_write(60)
+        for url in (
+            '/api/dashboard/overview/',
+            '/api/budgets/spending_vs_budget/',
+            '/api/transactions/export/?file_format=csv',
+        ):
+            with self.subTest(url=url):
+                primary, replica = self.read(url)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_reads_right_after_a_write_go_to_the_primary(self):
+        self.age_last_write(60)
+        response = self.client.post('/api/transactions/', {
+            'type': 'expense', 'category': 'food', 'amount': '5.00', 'date': date.today().isoformat(),
+        })
+        self.assertEqual(response.status_code, 201)
+
+        primary, replica = self.read('/api/dashboard/overview/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        # Once the window has passed the replica is used again
+        self.age_last_write(settings.REPLICA_READ_YOUR_WRITES_SECONDS + 1)
+        primary, replica = self.read('/api/dashboard/overview/')
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_writes_go_to_the_primary(self):
+        self.age_last_write(60)
+        with replica_reads(self.user) as database:
+            self.assertEqual(database, 'replica')
+            self.assertEqual(Transaction.objects.all().db, 'replica')
+            self.assertEqual(Transaction.objects.create(
+                user=self.user, type='income', category='salary', amount=Decimal('1.00'), date=date.today(),
+            )._state.db, 'default')
+
+
+class ConditionalDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_cache_hit_and_not_modified_run_no_queries(self):
+        first = self.client.get('/api/dashboard/overview/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            hit = self.client.get('/api/dashboard/overview/')
+        self.assertEqual(hit['X-Cache'], 'HIT')
+        self.assertEqual(hit['ETag'], first['ETag'])
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/api/dashboard/overview/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_write_changes_etag(self):
+        etag = self.client.get('/api/dashboard/overview/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/', {
+                'type': 'expense', 'category': 'food', 'amount': '5.00', 'date': date.today().isoformat(),
+            }, format='json')
+
+        response = self.client.get('/api/dashboard/overview/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.json()['total_expenses']), Decimal('5.00'))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_overview(self):
+        return self.client.get('/api/dashboard/overview/')
+
+    def test_transactions_bulk_changed_invalidates_cached_responses(self):
+        self.assertEqual(self.get_overview()['X-Cache'], 'MISS')
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, type='expense', category='food', amount=Decimal('7.00'), date=date.today()),
+        ])
+        with self.captureOnCommitCallbacks(execute=True):
+            transactions_bulk_changed.send(sender=Transaction, user=self.user, dates={date.today()})
+
+        response = self.get_overview()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(Decimal(response.json()['total_expenses']), Decimal('7.00'))
+
+    def test_budgets_bulk_changed_invalidates_cached_responses(self):
+        self.assertEqual(self.get_overview()['X-Cache'], 'MISS')
+        Budget.objects.bulk_create([Budget(user=self.user, category='food', limit_amount=Decimal('50.00'))])
+        with self.captureOnCommitCallbacks(execute=True):
+            budgets_bulk_changed.send(sender=Budget, user=self.user)
+
+        response = self.get_overview()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual([item['category'] for item in response.json()['budget_progress']], ['food'])
+
+    def test_hits_and_misses_are_counted_in_metrics(self):
+        registry.reset()
+        self.get_overview()
+        self.get_overview()
+        self.get_overview()
+        rendered = registry.render()
+        self.assertIn('api_response_cache_total{result="hits"} 2', rendered)
+        self.assertIn('api_response_cache_total{result="misses"} 1', rendered)
+
+
+@override_settings(ROOT_URLCONF='api.tests', ASYNC_QUERY_THREADS=0, METRICS_ENABLED=True)
+class AsyncDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        Budget.objects.create(user=self.user, category='food', limit_amount=Decimal('100.00'))
+        for category, amount in (('food', '12.50'), ('transport', '4.00')):
+            Transaction.objects.create(
+                user=self.user, type='expense', category=category, amount=Decimal(amount), date=date.today(),
+            )
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def viewset_data(self, action):
+        """The viewset action's response, computed rather than read from the shared response cache"""
+        request = APIRequestFactory().get(f'/api/dashboard/{action}/')
+        force_authenticate(request, self.user)
+        response = DashboardViewSet.as_view({'get': action})(request)
+        response.render()
+        cache.clear()
+        return json.loads(response.content)
+
+    async def test_async_views_match_the_viewset(self):
+        for action in ('overview', 'spending_breakdown', 'spending_trend', 'recent_transactions'):
+            self.assertTrue(iscoroutinefunction(resolve(f'/api/dashboard/{action}/').func))
+            expected = await sync_to_async(self.viewset_data)(action)
+            response = await self.async_client.get(f'/api/dashboard/{action}/', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(response.json(), expected)
+
+            not_modified = await self.async_client.get(
+                f'/api/dashboard/{action}/', headers={**self.headers, 'If-None-Match': response['ETag']},
+            )
+            self.assertEqual(not_modified.status_code, 304)
+
+    async def test_metrics_count_queries_of_async_views(self):
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(self.async_client.handler.get_response_async)))
+        await self.async_client.get('/api/dashboard/overview/', headers=self.headers)
+        metrics = registry.routes[('dashboard-overview', 'GET')]
+        self.assertEqual(metrics.latency.count, 1)
+        self.assertGreater(metrics.queries.sum, 0)
+
+
+class EmailCaseTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_register_and_login_ignore_email_case(self):
+        response = self.client.post('/api/auth/register/', {
+            'email': 'Owner@Example.com', 'password': 'password123', 'password_confirm': 'password123',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        user_id = response.json()['user']['id']
+
+        response = self.client.post('/api/auth/register/', {
+            'email': 'owner@example.COM', 'password': 'password123', 'password_confirm': 'password123',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+        response = self.client.post('/api/auth/login/', {
+            'email': 'OWNER@example.com', 'password': 'password123',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['id'], user_id)
+        self.assertEqual(User.objects.count(), 1)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123', first_name='Ada')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def get_me(self):
+        return self.client.get('/api/auth/me/')
+
+    def test_cached_lookup_runs_no_queries(self):
+        self.assertEqual(self.get_me().json()['first_name'], 'Ada')
+        with self.assertNumQueries(0):
+            response = self.get_me()
+        self.assertEqual(response.json()['first_name'], 'Ada')
+
+        entry = cache.get(AUTH_USER_KEY.format(user_id=self.user.pk))
+        self.assertNotIn('password', entry)
+
+    def test_invalidation_takes_effect(self):
+        self.get_me()
+        # A queryset update sends no signals, so the cached user is stale...
+        User.objects.filter(pk=self.user.pk).update(first_name='Grace')
+        self.assertEqual(self.get_me().json()['first_name'], 'Ada')
+        # ...until it is invalidated
+        invalidate_cached_user(self.user.pk)
+        self.assertEqual(self.get_me().json()['first_name'], 'Grace')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get_me().status_code, 401)
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        job_handler('test-echo')(self.echo)
+        self.addCleanup(JOB_HANDLERS.pop, 'test-echo')
+
+    def echo(self, user, fail=False, **params):
+        if fail:
+            raise ValueError('handler failed')
+        return params
+
+    def make_stale(self, job):
+        stale = timezone.now() - timedelta(seconds=settings.JOB_STALE_AFTER_SECONDS + 1)
+        Job.objects.filter(pk=job.pk).update(started_at=stale, heartbeat_at=stale)
+
+    def test_each_job_is_claimed_once(self):
+        first = enqueue('test-echo', self.user, n=1)
+        second = enqueue('test-echo', self.user, n=2)
+        claims = [claim_next(), claim_next(), claim_next()]
+        self.assertEqual([claims[0].pk, claims[1].pk, claims[2]], [first.pk, second.pk, None])
+        self.assertEqual([claims[0].attempts, claims[1].attempts], [1, 1])
+
+    def test_handler_error_fails_the_job(self):
+        enqueue('test-echo', self.user, fail=True)
+        job = run_job(claim_next())
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('handler failed', Job.objects.get(pk=job.pk).error)
+
+    def test_stale_job_is_retried_and_the_old_claim_cannot_record(self):
+        enqueue('test-echo', self.user, n=1)
+        first_claim = claim_next()
+        self.make_stale(first_claim)
+        self.assertEqual(requeue_stale(), 1)
+
+        retry = claim_next()
+        self.assertEqual(retry.attempts, 2)
+        # The presumed-dead worker finishes after the retry was claimed
+        self.assertEqual(run_job(first_claim).status, 'running')
+        self.assertIsNone(Job.objects.get(pk=retry.pk).result)
+
+        self.assertEqual(run_job(retry).status, 'succeeded')
+        self.assertEqual(Job.objects.get(pk=retry.pk).result, {'n': 1})
+
+    def test_long_running_job_with_heartbeat_is_not_requeued(self):
+        enqueue('test-echo', self.user)
+        job = claim_next()
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(days=1))
+        self.assertEqual(requeue_stale(), 0)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'running')
+
+    @override_settings(JOB_MAX_ATTEMPTS=1)
+    def test_stale_job_out_of_attempts_fails(self):
+        enqueue('test-echo', self.user)
+        job = claim_next()
+        self.make_stale(job)
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, 'failed')
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    @override_settings(JOB_HEARTBEAT_SECONDS=0.05)
+    def test_running_job_refreshes_its_heartbeat(self):
+        user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        job_handler('test-sleep')(lambda user: time.sleep(0.3))
+        self.addCleanup(JOB_HANDLERS.pop, 'test-sleep')
+
+        enqueue('test-sleep', user)
+        job = claim_next()
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'succeeded')
+        self.assertGreater(job.heartbeat_at, job.started_at)
+
+
+class TransactionRowSerializationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+        today = date.today()
+        for type, category, amount, day in (
+            ('expense', 'food', Decimal('12.5'), today),
+            ('expense', 'utilities', Decimal('0.10'), today - timedelta(days=31)),
+            ('income', 'salary', Decimal('1234.56'), date(2024, 2, 29)),
+            ('expense', 'other', Decimal('99999999.99'), date(2000, 1, 1)),
+        ):
+            Transaction.objects.create(
+                user=self.user, type=type, category=category, amount=amount, date=day,
+                description=f'{category} on {day}',
+            )
+        self.queryset = Transaction.objects.filter(user=self.user).order_by('-date', 'id')
+
+    def test_fast_path_matches_serializer(self):
+        expected = TransactionSerializer(self.queryset, many=True).data
+        rows = serialize_transaction_rows(transaction_rows(self.queryset))
+        self.assertEqual(rows, [dict(item) for item in expected])
+        self.assertEqual(
+            [(row['amount'], row['date'], row['category']) for row in rows],
+            [(item['amount'], item['date'], item['category']) for item in expected],
+        )
+
+    def test_sparse_fast_path_matches_serializer(self):
+        fields = ['category', 'amount', 'date']
+        expected = TransactionSerializer(self.queryset, many=True, fields=fields).data
+        rows = serialize_transaction_rows(transaction_rows(self.queryset, fields), fields)
+        self.assertEqual(rows, [dict(item) for item in expected])
+
+
+class QueryPlanTests(TestCase):
+    def test_endpoints_do_not_scan_tables(self):
+        """EXPLAIN every query of the checked endpoints; any full table scan fails"""
+        try:
+            call_command('check_query_plans', stdout=StringIO())
+        except CommandError as error:
+            self.fail(str(error))
+
+
+class SyncTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner@example.com', 'owner@example.com', 'password123')
+
+    @override_settings(SYNC_SAFETY_MARGIN_SECONDS=0)
+    def test_token_does_not_pass_a_pending_write(self):
+        with pending_write(self.user.pk):
+            # Rows of the open write are stamped after it started...
+            Transaction.objects.create(
+                user=self.user, type='expense', category='food', amount=Decimal('5.00'), date=date.today(),
+            )
+            # ...and a sync running meanwhile must not hand out a later token
+            since = decode_sync_token(sync_changes(self.user)['next'])
+
+        changes = sync_changes(self.user, since)
+        self.assertEqual([row['amount'] for row in changes['transactions']], ['5.00'])
+
+    def test_token_lags_by_safety_margin_without_pending_writes(self):
+        since = decode_sync_token(sync_changes(self.user)['next'])
+        Transaction.objects.create(
+            user=self.user, type='expense', category='food', amount=Decimal('5.00'), date=date.today(),
+        )
+        self.assertEqual(len(sync_changes(self.user, since)['transactions']), 1)
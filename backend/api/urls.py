@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from .views import AuthViewSet, TransactionViewSet, BudgetViewSet, DashboardViewSet
+from . import async_views
+from .metrics import MetricsView
+from .views import AuthViewSet, TransactionViewSet, BudgetViewSet, DashboardViewSet, BatchViewSet, SyncViewSet, JobViewSet, ReportViewSet, BudgetAlertViewSet
 
 router = DefaultRouter()
 router.register(r'auth', AuthViewSet, basename='auth')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'budgets', BudgetViewSet, basename='budget')
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'batch', BatchViewSet, basename='batch')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'jobs', JobViewSet, basename='job')
+router.register(r'reports', ReportViewSet, basename='report')
+router.register(r'alerts', BudgetAlertViewSet, basename='alert')
 
 urlpatterns = [
     # Router-managed viewset endpoints (e.g. /api/auth/register/)
@@ -20,4 +28,18 @@ urlpatterns = [
     # /api/auth/token/ and /api/auth/token/refresh/
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    # Prometheus text-format request metrics (staff only)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+]
+
+async_dashboard_urlpatterns = [
+    path('dashboard/overview/', async_views.overview, name='dashboard-overview'),
+    path('dashboard/spending_breakdown/', async_views.spending_breakdown_view, name='dashboard-spending-breakdown'),
+    path('dashboard/spending_trend/', async_views.spending_trend_view, name='dashboard-spending-trend'),
+    path('dashboard/recent_transactions/', async_views.recent_transactions_view, name='dashboard-recent-transactions'),
 ]
+
+if settings.ASYNC_DASHBOARD:
+    # Async dashboard views take precedence over the router's sync actions
+    urlpatterns = async_dashboard_urlpatterns + urlpatterns
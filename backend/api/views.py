@@ -1,23 +1,47 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth.models import User
-from django.db.models import Sum, Q
-from datetime import datetime, timedelta
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from datetime import datetime
 from decimal import Decimal
 from .serializers import (
     RegisterSerializer,
     LoginSerializer,
     UserSerializer,
-    AuthResponseSerializer,
     TransactionSerializer,
     BudgetSerializer,
-    DashboardOverviewSerializer,
-    SpendingBreakdownSerializer,
+    BudgetAlertSerializer,
+    JobSerializer,
+    parse_sparse_fields,
+    serialize_transaction_rows,
+    transaction_rows,
 )
-from .models import Transaction, Budget
+from .analytics import (
+    dashboard_overview,
+    overview_totals,
+    parse_trend_params,
+    recent_transactions,
+    spending_breakdown,
+    spending_trend,
+    user_budgets,
+)
+from .batch import BatchError, run_batch
+from .cache import cached_per_user
+from .conditional import conditional_on_user_data
+from .exporters import EXPORT_FORMATS, EXPORT_WRITERS
+from .importers import ImportFileError, detect_format, import_transactions
+from .jobs import enqueue
+from .pagination import TransactionPagination
+from .reports import parse_report_years
+from .routers import read_from_replica, replica_reads
+from .sync import InvalidSyncToken, decode_sync_token, sync_changes
+from .models import ArchivedTransaction, BudgetAlert, Job, Transaction, Budget, MonthlyCategoryTotal
 
 
 class AuthViewSet(viewsets.ViewSet):
@@ -70,10 +94,43 @@ class AuthViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class SparseFieldsViewMixin:
+    """
+    Sparse fieldsets for GET requests: ``?fields=a,b`` or ``?exclude=a,b``.
+
+    The serializer drops the other fields and the queryset defers their
+    columns, so they are neither fetched nor sent.
+    """
+
+    def sparse_fields(self):
+        """Requested field names, or None for all of them"""
+        if self.request.method not in ('GET', 'HEAD'):
+            return None
+        if not hasattr(self, '_sparse_fields'):
+            fields, error = parse_sparse_fields(
+                self.request.query_params, self.get_serializer_class().Meta.fields
+            )
+            if error:
+                raise ParseError({'error': error})
+            self._sparse_fields = fields
+        return self._sparse_fields
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.sparse_fields()
+        # Serializer field names are model field names on these viewsets
+        return queryset if fields is None else queryset.only(*fields)
+
+
+class TransactionViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """ViewSet for CRUD operations on transactions"""
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = TransactionPagination
 
     def get_queryset(self):
         """Return transactions for the authenticated user only"""
@@ -83,7 +140,134 @@ class TransactionViewSet(viewsets.ModelViewSet):
         """Automatically set the user to the current authenticated user"""
         serializer.save(user=self.request.user)
 
+    def archived_queryset(self):
+        """
+        The user's archived transactions when ``?include_archived=true`` was
+        passed, otherwise None
+        """
+        if self.request.query_params.get('include_archived', '').lower() not in ('true', '1'):
+            return None
+        return ArchivedTransaction.objects.filter(user=self.request.user)
+
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.listing_response(queryset, paginate=True, archived=self.archived_queryset())
+
+    @conditional_on_user_data
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def listing_response(self, queryset, paginate=False, archived=None):
+        """
+        Serialize a listing through the fast read path.
+
+        Custom listings are only paginated when cursor mode is requested;
+        the default list endpoint is always paginated. ``archived`` rows,
+        when given, are listed together with ``queryset``.
+        """
+        fields = self.sparse_fields()
+        cursor_mode = self.paginator.is_cursor_mode(self.request)
+        # Cursor links, and ordering the union with archived rows, need
+        # the keyset position columns
+        extra = ('date', 'created_at', 'id') if cursor_mode or archived is not None else ()
+        rows = transaction_rows(queryset, fields, extra)
+        if archived is not None:
+            rows = (rows, transaction_rows(archived, fields, extra))
+        if paginate or cursor_mode:
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(serialize_transaction_rows(page, fields))
+
+        return Response(serialize_transaction_rows(rows, fields))
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='import',
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def import_file(self, request):
+        """Bulk import transactions from an uploaded CSV, OFX or QIF file"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            batch_size = int(request.data.get('batch_size') or settings.TRANSACTION_IMPORT_BATCH_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'batch_size must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            file_format = detect_format(upload.name, request.data.get('file_format'))
+            report = import_transactions(
+                request.user,
+                upload,
+                file_format,
+                default_category=request.data.get('default_category'),
+                date_format=request.data.get('date_format'),
+                batch_size=max(1, min(batch_size, 5000)),
+                skip_invalid=request.data.get('skip_invalid') in ('true', 'True', '1'),
+            )
+        except ImportFileError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if report['error_count'] and not report['created']:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all matching transactions as CSV or NDJSON"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in EXPORT_WRITERS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(EXPORT_WRITERS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {}
+        try:
+            start_date = request.query_params.get('start_date')
+            if start_date:
+                filters['date__gte'] = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = request.query_params.get('end_date')
+            if end_date:
+                filters['date__lte'] = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {'error': 'Date format should be YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        category = request.query_params.get('category')
+        if category:
+            filters['category'] = category
+
+        sources = [self.get_queryset().filter(**filters)]
+        archived = self.archived_queryset()
+        if archived is not None:
+            # Archived rows are older, so they follow the hot ones
+            sources.append(archived.filter(**filters))
+        # Rows are read while the response streams, after this view has
+        # returned, so the querysets are bound to the replica up front
+        with replica_reads(request.user) as database:
+            sources = [source.using(database) for source in sources]
+        response = StreamingHttpResponse(
+            EXPORT_WRITERS[file_format](*sources),
+            content_type=EXPORT_FORMATS[file_format],
+        )
+        response['Content-Disposition'] = f'attachment; filename="transactions.{file_format}"'
+        return response
+
+    @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def by_category(self, request):
         """Get transactions filtered by category"""
         category = request.query_params.get('category')
@@ -94,10 +278,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
             )
         
         transactions = self.get_queryset().filter(category=category)
-        serializer = self.get_serializer(transactions, many=True)
-        return Response(serializer.data)
+        return self.listing_response(transactions)
 
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def by_date_range(self, request):
         """Get transactions within a date range"""
         start_date = request.query_params.get('start_date')
@@ -119,10 +303,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
             )
         
         transactions = self.get_queryset().filter(date__range=[start, end])
-        serializer = self.get_serializer(transactions, many=True)
-        return Response(serializer.data)
+        return self.listing_response(transactions)
 
     @action(detail=False, methods=['get'])
+    @conditional_on_user_data
     def expenses_this_month(self, request):
         """Get expenses for the current month"""
         today = datetime.now().date()
@@ -133,11 +317,10 @@ class TransactionViewSet(viewsets.ModelViewSet):
             date__gte=first_day,
             date__lte=today
         )
-        serializer = self.get_serializer(transactions, many=True)
-        return Response(serializer.data)
+        return self.listing_response(transactions)
 
 
-class BudgetViewSet(viewsets.ModelViewSet):
+class BudgetViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """ViewSet for CRUD operations on budgets"""
     serializer_class = BudgetSerializer
     permission_classes = [IsAuthenticated]
@@ -150,24 +333,36 @@ class BudgetViewSet(viewsets.ModelViewSet):
         """Automatically set the user to the current authenticated user"""
         serializer.save(user=self.request.user)
 
+    @conditional_on_user_data
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_on_user_data
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @conditional_on_user_data
+    @cached_per_user
     def spending_vs_budget(self, request):
         """Compare spending against budgets for the current month"""
         today = datetime.now().date()
         first_day = today.replace(day=1)
         
         budgets = self.get_queryset()
+        spending_by_category = dict(
+            MonthlyCategoryTotal.objects.filter(
+                user=request.user,
+                type='expense',
+                month=first_day
+            ).values_list('category', 'total')
+        )
         result = []
         
         for budget in budgets:
-            # Get spending for this category this month
-            spending = Transaction.objects.filter(
-                user=request.user,
-                type='expense',
-                category=budget.category,
-                date__gte=first_day,
-                date__lte=today
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+            # Spending for this category this month, from the monthly rollup
+            spending = spending_by_category.get(budget.category, Decimal('0.00'))
             
             result.append({
                 'category': budget.category,
@@ -186,119 +381,165 @@ class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @conditional_on_user_data
+    @cached_per_user
     def overview(self, request):
         """Get dashboard overview with key metrics"""
-        user = request.user
-        
-        # Calculate totals
-        total_expenses = Transaction.objects.filter(
-            user=user,
-            type='expense'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        total_income = Transaction.objects.filter(
-            user=user,
-            type='income'
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        net_balance = total_income - total_expenses
-        
-        # This month's spending
-        today = datetime.now().date()
-        first_day = today.replace(day=1)
-        this_month_spending = Transaction.objects.filter(
-            user=user,
-            type='expense',
-            date__gte=first_day,
-            date__lte=today
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        # Budget progress
-        budgets = Budget.objects.filter(user=user)
-        budget_progress = []
-        for budget in budgets:
-            spending = Transaction.objects.filter(
-                user=user,
-                type='expense',
-                category=budget.category,
-                date__gte=first_day,
-                date__lte=today
-            ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-            
-            budget_progress.append({
-                'category': budget.category,
-                'limit': str(budget.limit_amount),
-                'spent': str(spending),
-                'percentage': float((spending / budget.limit_amount * 100)) if budget.limit_amount > 0 else 0,
-            })
-        
-        data = {
-            'total_expenses': str(total_expenses),
-            'total_income': str(total_income),
-            'net_balance': str(net_balance),
-            'this_month_spending': str(this_month_spending),
-            'budget_progress': budget_progress,
-        }
-        
+        first_day = datetime.now().date().replace(day=1)
+
+        # Totals, this month's spending and per-budget spending are all
+        # computed in a single conditional aggregate over the monthly rollup.
+        budgets = user_budgets(request.user)
+        totals = overview_totals(request.user, first_day, budgets)
+        data = dashboard_overview(budgets, totals, totals['budget_spending'])
+
         return Response(data)
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @conditional_on_user_data
+    @cached_per_user
     def spending_breakdown(self, request):
         """Get spending breakdown by category for current month"""
-        today = datetime.now().date()
-        first_day = today.replace(day=1)
-        
-        transactions = Transaction.objects.filter(
-            user=request.user,
-            type='expense',
-            date__gte=first_day,
-            date__lte=today
-        ).values('category').annotate(total=Sum('amount'))
-        
-        # Calculate total for percentage
-        total_spending = sum(t['total'] for t in transactions) or Decimal('1')
-        
-        result = []
-        for item in transactions:
-            result.append({
-                'category': item['category'],
-                'amount': str(item['total']),
-                'percentage': float((item['total'] / total_spending * 100)),
-            })
-        
-        return Response(result)
+        first_day = datetime.now().date().replace(day=1)
+        return Response(spending_breakdown(request.user, first_day))
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @conditional_on_user_data
+    @cached_per_user
     def spending_trend(self, request):
-        """Get spending trend over last 30 days"""
-        today = datetime.now().date()
-        start_date = today - timedelta(days=29)
-        
-        # Group by date and sum
-        transactions = Transaction.objects.filter(
-            user=request.user,
-            type='expense',
-            date__gte=start_date,
-            date__lte=today
-        ).values('date').annotate(total=Sum('amount')).order_by('date')
-        
-        result = []
-        for item in transactions:
-            result.append({
-                'date': item['date'],
-                'amount': str(item['total']),
-            })
-        
+        """
+        Get the spending trend, gap-filled, for the last ``window`` buckets
+
+        Query parameters: ``bucket`` (day, week, month or year; default day),
+        ``window`` (number of buckets; default 30 days, 12 weeks, 12 months or
+        5 years), ``type`` (expense, income or all; default expense) and
+        ``split`` (category or type) for a per-bucket breakdown.
+        """
+        options, error = parse_trend_params(request.query_params)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = spending_trend(request.user, today=datetime.now().date(), **options)
         return Response(result)
 
     @action(detail=False, methods=['get'])
+    @read_from_replica
+    @conditional_on_user_data
+    @cached_per_user
     def recent_transactions(self, request):
         """Get recent transactions"""
         limit = int(request.query_params.get('limit', 10))
-        transactions = Transaction.objects.filter(
-            user=request.user
-        ).order_by('-date', '-created_at')[:limit]
-        
-        serializer = TransactionSerializer(transactions, many=True)
-        return Response(serializer.data)
+        return Response(recent_transactions(request.user, limit))
+
+
+class BatchViewSet(viewsets.ViewSet):
+    """Apply many transaction and budget writes in one request and database transaction"""
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request):
+        """
+        Run a batch of create, update and delete operations
+
+        All operations are validated first; if any is invalid nothing is
+        applied and the per-operation errors are returned.
+        """
+        operations = request.data.get('operations') if isinstance(request.data, dict) else request.data
+        try:
+            results, errors = run_batch(request.user, operations)
+        except BatchError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        if errors:
+            return Response(
+                {'error': 'Batch rejected; no operations were applied', 'operations': errors},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """Delta sync of transactions and budgets for offline-capable clients"""
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        """
+        Get rows changed and ids deleted since the ``since`` token
+
+        Omit ``since`` for a full snapshot. Store the returned ``next`` token
+        and send it as ``since`` on the following sync.
+        """
+        since = request.query_params.get('since')
+        try:
+            since = decode_sync_token(since) if since else None
+        except InvalidSyncToken as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(sync_changes(request.user, since))
+
+
+class BudgetAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Budget threshold alerts, recorded as spending crosses them.
+
+    The list holds unread alerts only, newest first; clients poll it to
+    decide whether to show a warning.
+    """
+    serializer_class = BudgetAlertSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Return alerts for the authenticated user only"""
+        alerts = BudgetAlert.objects.filter(user=self.request.user)
+        if self.action == 'list':
+            alerts = alerts.filter(read_at__isnull=True)
+        return alerts
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        """Mark one alert as read"""
+        alert = self.get_object()
+        if alert.read_at is None:
+            alert.read_at = timezone.now()
+            alert.save(update_fields=['read_at'])
+        return Response(self.get_serializer(alert).data)
+
+    @action(detail=False, methods=['post'])
+    def read_all(self, request):
+        """Mark every unread alert as read"""
+        count = BudgetAlert.objects.filter(user=request.user, read_at__isnull=True).update(
+            read_at=timezone.now()
+        )
+        return Response({'marked_read': count})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status and results of the user's background jobs"""
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Return jobs for the authenticated user only"""
+        return Job.objects.filter(user=self.request.user)
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """Reports too slow to build inside a request; they run as background jobs"""
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['post'])
+    def yearly(self, request):
+        """
+        Queue a yearly report for ``start_year`` to ``end_year``
+
+        Poll the returned job at /api/jobs/<id>/ until its status is
+        succeeded (the report is in ``result``) or failed.
+        """
+        params, error = parse_report_years(request.data)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
+        job = enqueue('yearly_report', user=request.user, **params)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
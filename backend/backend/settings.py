@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
+    'api.middleware.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -61,6 +63,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# WhiteNoise is sync-only: under ASGI it puts every request, async views
+# included, back on a thread. Set SERVE_STATIC_FILES=False there and serve
+# /static/ from elsewhere
+SERVE_STATIC_FILES = os.getenv('SERVE_STATIC_FILES', 'True') == 'True'
+if not SERVE_STATIC_FILES:
+    MIDDLEWARE.remove('whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -86,20 +95,60 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 import dj_database_url
 
+# Connection lifetime and pooling. Each gunicorn worker process holds its own
+# connections, so the pool is sized from the worker/thread counts to keep the
+# total under DB_MAX_CONNECTIONS (the connection budget for this service).
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '1'))
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', '20'))
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', '60'))
+DB_CONN_HEALTH_CHECKS = os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True'
+DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', '10'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+DB_POOL = os.getenv('DB_POOL', 'False') == 'True'
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv(
+    'DB_POOL_MAX_SIZE',
+    str(max(1, min(GUNICORN_THREADS, DB_MAX_CONNECTIONS // WEB_CONCURRENCY))),
+))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '10'))
+
+# Django's native connection pool needs psycopg 3 with psycopg_pool; the
+# api.E003 system check fails when DB_POOL is set without them
+try:
+    import psycopg  # noqa: F401
+    import psycopg_pool  # noqa: F401
+    DB_POOL_AVAILABLE = True
+except ImportError:
+    DB_POOL_AVAILABLE = False
+
 # Use Supabase PostgreSQL if DATABASE_URL is set, otherwise fallback to SQLite
 if os.getenv('DATABASE_URL'):
+    use_pool = DB_POOL and DB_POOL_AVAILABLE
     DATABASES = {
         'default': dj_database_url.config(
             default=os.getenv('DATABASE_URL'),
-            conn_max_age=0,
-            conn_health_checks=True,
+            # Pooled connections are returned to the pool after each request
+            conn_max_age=0 if use_pool else DB_CONN_MAX_AGE,
+            conn_health_checks=DB_CONN_HEALTH_CHECKS,
         )
     }
     # Add Supabase-specific options
     DATABASES['default']['OPTIONS'] = {
-        'connect_timeout': 10,
-        'options': '-c statement_timeout=30000'
+        'connect_timeout': DB_CONNECT_TIMEOUT,
+        'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
     }
+    if use_pool:
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    # Transaction-mode poolers such as PgBouncer / the Supabase pooler on
+    # port 6543 cannot hold the server-side cursors used by iterator()
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = (
+        os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'False') == 'True'
+    )
 else:
     DATABASES = {
         'default': {
@@ -109,6 +158,68 @@ else:
     }
 
 
+# Read replicas: comma-separated database URLs with the same schema and data
+# as the primary. Read-only analytics are routed to them (see api.routers);
+# a user who wrote within REPLICA_READ_YOUR_WRITES_SECONDS keeps reading from
+# the primary, so set it above the replicas' usual lag.
+REPLICA_DATABASES = []
+for index, url in enumerate(filter(None, (url.strip() for url in os.getenv('REPLICA_DATABASE_URLS', '').split(',')))):
+    replica = dj_database_url.parse(
+        url,
+        conn_max_age=DATABASES['default'].get('CONN_MAX_AGE', 0),
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    if replica['ENGINE'] == DATABASES['default']['ENGINE']:
+        # Same timeouts, pool and cursor settings as the primary
+        replica['OPTIONS'] = dict(DATABASES['default'].get('OPTIONS', {}))
+        if 'DISABLE_SERVER_SIDE_CURSORS' in DATABASES['default']:
+            replica['DISABLE_SERVER_SIDE_CURSORS'] = DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS']
+    # Tests read the primary's test database through the replica alias
+    replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f'replica_{index}'] = replica
+    REPLICA_DATABASES.append(f'replica_{index}')
+
+# A second connection to the primary, only used where REPLICA_DATABASES is
+# overridden with it: the replica routing tests read through this alias
+DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+REPLICA_READ_YOUR_WRITES_SECONDS = int(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', '5'))
+
+# Cache
+# Data versions, cached users and cached responses must be shared by every
+# worker, or invalidation only reaches the worker that took the write. Local
+# memory is per process, so it is only the default for a single worker; use
+# the file-based backend for workers on one host, or Redis across hosts.
+# "manage.py check" fails on locmem with WEB_CONCURRENCY > 1.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file' if WEB_CONCURRENCY > 1 else 'locmem')
+if CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/budget-tracker-cache'),
+        }
+    }
+elif CACHE_BACKEND == 'redis':
+    # Requires: pip install redis
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'budget-tracker',
+        }
+    }
+
+# Lifetime in seconds of cached dashboard and budget responses
+API_CACHE_TIMEOUT = int(os.getenv('API_CACHE_TIMEOUT', '300'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -180,7 +291,7 @@ CORS_ALLOW_HEADERS = [
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -188,8 +299,78 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    # orjson-backed, same output as DRF's JSONRenderer / JSONParser
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+# JSON/CSV responses smaller than this many bytes are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+# Brotli quality 0-11; 4-5 compresses better than gzip at similar CPU cost
+COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4'))
+
+# Seconds a JWT-authenticated user is cached (0 = look up on every request).
+# Off with the local-memory cache and several workers (WEB_CONCURRENCY > 1);
+# with one worker, changes made by manage.py apply once the entry expires
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv('AUTH_USER_CACHE_TIMEOUT', '60'))
+
+# Transaction bulk import and export
+TRANSACTION_IMPORT_BATCH_SIZE = int(os.getenv('TRANSACTION_IMPORT_BATCH_SIZE', '500'))
+TRANSACTION_IMPORT_MAX_ERRORS = int(os.getenv('TRANSACTION_IMPORT_MAX_ERRORS', '100'))
+TRANSACTION_EXPORT_CHUNK_SIZE = int(os.getenv('TRANSACTION_EXPORT_CHUNK_SIZE', '2000'))
+
+# manage.py archive_transactions: move transactions older than this many days
+# into the archive table, this many rows per database transaction
+TRANSACTION_ARCHIVE_AFTER_DAYS = int(os.getenv('TRANSACTION_ARCHIVE_AFTER_DAYS', '730'))
+TRANSACTION_ARCHIVE_BATCH_SIZE = int(os.getenv('TRANSACTION_ARCHIVE_BATCH_SIZE', '1000'))
+
+# Async dashboard views (for ASGI servers such as uvicorn); independent
+# queries run concurrently on a thread pool with one connection per thread
+ASYNC_DASHBOARD = os.getenv('ASYNC_DASHBOARD', 'False') == 'True'
+ASYNC_QUERY_THREADS = int(os.getenv('ASYNC_QUERY_THREADS', '4'))
+
+# Maximum create/update/delete operations in one POST /api/batch/ request
+BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '500'))
+
+# Budget alerts are recorded when a month's spending reaches these
+# percentages of a budget's limit
+BUDGET_ALERT_THRESHOLDS = sorted(
+    int(value) for value in os.getenv('BUDGET_ALERT_THRESHOLDS', '50,80,100').split(',') if value.strip()
+)
+
+# Admin changelists use PostgreSQL's row estimate above this many rows
+# instead of an exact COUNT(*)
+ADMIN_EXACT_COUNT_LIMIT = int(os.getenv('ADMIN_EXACT_COUNT_LIMIT', '10000'))
+
+# Delta sync (GET /api/sync/): how long deletions are remembered, and how far
+# behind "now" the returned token lies to cover late-committing writes
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv('SYNC_TOMBSTONE_RETENTION_DAYS', '90'))
+SYNC_SAFETY_MARGIN_SECONDS = int(os.getenv('SYNC_SAFETY_MARGIN_SECONDS', '5'))
+
+# Background jobs (python manage.py run_jobs)
+JOB_WORKER_CONCURRENCY = int(os.getenv('JOB_WORKER_CONCURRENCY', '2'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))
+# Statement timeout for job queries; 0 means none (web requests keep DB_STATEMENT_TIMEOUT_MS)
+JOB_STATEMENT_TIMEOUT_MS = int(os.getenv('JOB_STATEMENT_TIMEOUT_MS', '0'))
+# Running jobs refresh a heartbeat this often; one whose heartbeat is older
+# than JOB_STALE_AFTER_SECONDS is assumed to have lost its worker
+JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_AFTER_SECONDS = int(os.getenv('JOB_STALE_AFTER_SECONDS', '300'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', '7'))
+JOB_ERROR_MAX_LENGTH = 4000
+REPORT_MAX_YEARS = int(os.getenv('REPORT_MAX_YEARS', '10'))
+
+# Per-route request metrics, exposed to staff at /api/metrics/
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True') == 'True'
+
 # Simple JWT Configuration
 from datetime import timedelta
 
@@ -76,10 +76,13 @@ export const dashboardAPI = {
   }),
 };
 
+// Columns the list views never show; the API skips fetching them
+const LIST_EXCLUDE = 'user,created_at,updated_at';
+
 // Transactions API calls
 export const transactionsAPI = {
   getAll: (filters = {}) => {
-    const query = new URLSearchParams(filters).toString();
+    const query = new URLSearchParams({ exclude: LIST_EXCLUDE, ...filters }).toString();
     return apiCall(`/transactions/${query ? `?${query}` : ''}`);
   },
   create: (transactionData) => apiCall('/transactions/', {
@@ -95,7 +98,7 @@ export const transactionsAPI = {
 
 // Budgets API calls
 export const budgetsAPI = {
-  getAll: () => apiCall('/budgets/'),
+  getAll: () => apiCall(`/budgets/?exclude=${LIST_EXCLUDE}`),
   getById: (id) => apiCall(`/budgets/${id}/`),
   create: (budgetData) => apiCall('/budgets/', {
     method: 'POST',
@@ -109,6 +112,23 @@ export const budgetsAPI = {
   spending_vs_budget: () => apiCall('/budgets/spending_vs_budget/'),
 };
 
+// Batch API calls: one request, one database transaction. Operations look like
+// { op: 'create' | 'update' | 'delete', model: 'transaction' | 'budget', id, data }
+export const batchAPI = {
+  run: (operations) => apiCall('/batch/', {
+    method: 'POST',
+    body: JSON.stringify({ operations }),
+  }),
+  deleteTransactions: (ids) => batchAPI.run(
+    ids.map((id) => ({ op: 'delete', model: 'transaction', id }))
+  ),
+};
+
+// Delta sync: pass the `next` token from the previous call (omit for a full snapshot)
+export const syncAPI = {
+  changes: (since) => apiCall(`/sync/${since ? `?since=${encodeURIComponent(since)}` : ''}`),
+};
+
 // Expenses API calls
 export const expensesAPI = {
   create: (expenseData) => apiCall('/expenses/', {
@@ -118,12 +138,44 @@ export const expensesAPI = {
   getCategories: () => apiCall('/expenses/categories/'),
 };
 
+// Budget alerts: unread threshold crossings (50/80/100% of a budget)
+export const alertsAPI = {
+  getUnread: () => apiCall('/alerts/'),
+  markRead: (id) => apiCall(`/alerts/${id}/read/`, { method: 'POST' }),
+  markAllRead: () => apiCall('/alerts/read_all/', { method: 'POST' }),
+};
+
+// Background jobs: poll until the job has succeeded or failed
+export const jobsAPI = {
+  get: (id) => apiCall(`/jobs/${id}/`),
+  waitFor: async (id, { interval = 2000, timeout = 300000 } = {}) => {
+    const deadline = Date.now() + timeout;
+    while (Date.now() < deadline) {
+      const response = await jobsAPI.get(id);
+      if (!response.success) return response;
+      if (response.data.status === 'succeeded') return { success: true, data: response.data.result };
+      if (response.data.status === 'failed') return { success: false, error: response.data.error };
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+    return { success: false, error: 'Report is taking longer than expected' };
+  },
+};
+
 // Reports API calls (using Dashboard endpoints for financial reports)
 export const reportsAPI = {
   getOverview: () => dashboardAPI.getOverview(),
   getSpendingBreakdown: () => dashboardAPI.getSpendingBreakdown(),
   getSpendingTrend: () => dashboardAPI.getSpendingTrend(),
   getRecentTransactions: (limit = 10) => apiCall(`/dashboard/recent_transactions/?limit=${limit}`),
+  // Built by the background worker; resolves with the report once it is ready
+  getYearly: async (startYear, endYear = startYear) => {
+    const queued = await apiCall('/reports/yearly/', {
+      method: 'POST',
+      body: JSON.stringify({ start_year: startYear, end_year: endYear }),
+    });
+    if (!queued.success) return queued;
+    return jobsAPI.waitFor(queued.data.id);
+  },
 };
 
 // Auth API calls (Django JWT or Session auth)